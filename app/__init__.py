@@ -6,27 +6,50 @@ from flask_session import Session
 import os
 from app.routes.image_routes import image_bp
 from app.routes.vehicle_routes import vehicle_bp
+from app.utils.logger import setup_logging
+from app.services import inference_service
+from app.commands import models_cli, presence_cli, archive_cli
+from app.utils import hashing, db_routing
+from app.utils.session_store import create_session_interface
 from flask_migrate import Migrate
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
-    app.config['SESSION_TYPE'] = 'filesystem'  
+    setup_logging(app)
+    if app.config['TRUSTED_PROXIES']:
+        # Behind a load balancer, take the client address from X-Forwarded-For
+        app.wsgi_app = ProxyFix(
+            app.wsgi_app,
+            x_for=app.config['TRUSTED_PROXIES'],
+            x_proto=app.config['TRUSTED_PROXIES']
+        )
     app.config['SESSION_PERMANENT'] = False
     app.config['SESSION_USE_SIGNER'] = True
     app.config['SESSION_COOKIE_HTTPONLY'] = True
     app.config['SESSION_COOKIE_SAMESITE'] = 'Lax' 
     app.config['SESSION_COOKIE_SECURE'] = False 
     db.init_app(app)
+    db_routing.init_app(app)
     bcrypt.init_app(app)
-    Session(app)  
+    hashing.init_app(app)
+    inference_service.init_app(app)
+    if app.config['SESSION_BACKEND'] == 'filesystem':
+        app.config['SESSION_TYPE'] = 'filesystem'
+        Session(app)
+    else:
+        app.session_interface = create_session_interface(app)
     CORS(app, resources={r"/api/*": {"origins": "http://localhost:5173", "supports_credentials": True}})
     migrate = Migrate(app, db)
     from .routes.auth_routes import auth_bp
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(image_bp, url_prefix='/api/admin')
     app.register_blueprint(vehicle_bp, url_prefix="/api/admin")
+    app.cli.add_command(models_cli)
+    app.cli.add_command(presence_cli)
+    app.cli.add_command(archive_cli)
     @app.route('/uploads/<filename>')
     def uploaded_file(filename):
         uploads_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'uploads')
@@ -0,0 +1,419 @@
+"""ASGI serving mode.
+
+Dashboard reads, plate search, auth, gate logging and the live SSE feed
+run as async Starlette handlers on an async SQLAlchemy engine (asyncpg or
+aiosqlite), so an idle dashboard or SSE client costs a coroutine rather
+than a thread. The handlers share their queries and rules with the Flask
+routes through the service layer. Every other route, including the
+CPU-bound inference endpoints and the CSV export, falls through to the
+Flask app, which runs in a2wsgi's thread pool.
+"""
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from a2wsgi import WSGIMiddleware
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+from . import create_app
+from .extensions import db
+from .routes.image_routes import vehicle_data_cache
+from .routes.vehicle_routes import clean_plate
+from .services import plate_search_service, presence_service, stats_service
+from .services.auth_service import required_fields, rate_limit_wait, register_user_async, login_user_async
+from .services.log_service import commit_logs_async, logs_from_upload
+from .utils.db_routing import REPLICA_BIND
+from .utils.event_bus import RESYNC_FRAME, AsyncEventRelay, live_events
+from .utils.hashing import HashingBusyError
+from .utils.logger import get_logger, request_context
+
+logger = get_logger(__name__)
+
+ASYNC_DRIVERS = {'postgresql': 'postgresql+asyncpg', 'sqlite': 'sqlite+aiosqlite'}
+
+
+def async_url(url):
+    """Swap a sync database URL's driver for its async counterpart."""
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}' databases")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+class AsyncDatabase:
+    """Async engines mirroring the Flask app's primary and replica binds."""
+
+    def __init__(self, flask_app):
+        options = flask_app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+        override = flask_app.config.get('ASYNC_DATABASE_URI')
+        with flask_app.app_context():
+            # Resolved through Flask-SQLAlchemy so relative SQLite paths match
+            primary = db.engine.url
+            replica = db.engines.get(REPLICA_BIND)
+        self.engine = create_async_engine(override or async_url(primary), **options)
+        self.replica = create_async_engine(async_url(replica.url), **options) if replica else None
+        self.session = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.read_session = async_sessionmaker(self.replica or self.engine, expire_on_commit=False)
+
+    async def dispose(self):
+        await self.engine.dispose()
+        if self.replica is not None:
+            await self.replica.dispose()
+
+
+async def _json_body(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _rate_limited(request, email=None):
+    """Return a 429 response if the client is over the auth rate limit, else None."""
+    wait = rate_limit_wait(request.app.state.config, _client_ip(request), email)
+    if wait is None:
+        return None
+    return JSONResponse(
+        {'message': 'Too many attempts, please try again later'},
+        status_code=429,
+        headers={'Retry-After': str(wait)}
+    )
+
+
+def _busy():
+    return JSONResponse({'message': 'Server busy, please try again'}, status_code=503)
+
+
+def _client_ip(request):
+    """The socket address, or the X-Forwarded-For hop TRUSTED_PROXIES back, as ProxyFix picks for Flask."""
+    trusted = request.app.state.config.get('TRUSTED_PROXIES', 0)
+    if trusted:
+        forwarded = [value.strip() for value in ','.join(request.headers.getlist('x-forwarded-for')).split(',')]
+        if len(forwarded) >= trusted and forwarded[-trusted]:
+            return forwarded[-trusted]
+    return request.client.host if request.client else None
+
+
+async def _read(request, fn, *args):
+    """Run a sync service query on the async read engine.
+
+    `run_sync` executes `fn` on the event loop thread, so it must only do
+    database work; archive scans and index scoring go through `_offload`.
+    """
+    async with request.app.state.db.read_session() as reader:
+        return await reader.run_sync(fn, *args)
+
+
+async def _offload(fn, *args):
+    """Run CPU or file work (pyarrow, trigram scoring) in a worker thread."""
+    return await asyncio.to_thread(fn, *args)
+
+
+async def _stats(request, archived, query, *args):
+    """Read the archive side of a stats query off the loop, then run its SQL side."""
+    archive = await _offload(archived, request.app.state.config['ARCHIVE_DIR'], *args)
+    return await _read(request, query, archive)
+
+
+async def signup(request):
+    state = request.app.state
+    data = await _json_body(request)
+    if data is None:
+        return JSONResponse({'message': 'Invalid JSON body'}, status_code=400)
+    fields = required_fields(data, 'username', 'email', 'password')
+    if fields is None:
+        return JSONResponse({'message': 'All fields are required'}, status_code=400)
+    username, email, password = fields
+
+    limited = _rate_limited(request)
+    if limited:
+        return limited
+
+    async with state.db.session() as session:
+        try:
+            user, error = await register_user_async(session, username, email, password)
+        except HashingBusyError:
+            return _busy()
+    if error:
+        return JSONResponse({'message': error}, status_code=409)
+    return JSONResponse({'message': 'User registered successfully'}, status_code=201)
+
+
+async def login(request):
+    state = request.app.state
+    data = await _json_body(request)
+    if data is None:
+        return JSONResponse({'message': 'Invalid JSON body'}, status_code=400)
+    fields = required_fields(data, 'email', 'password')
+    if fields is None:
+        return JSONResponse({'message': 'Email and password required'}, status_code=400)
+    email, password = fields
+
+    # Reject abusive traffic before any bcrypt work is done
+    limited = _rate_limited(request, email)
+    if limited:
+        return limited
+
+    async with state.db.session() as session:
+        try:
+            user, error = await login_user_async(session, email, password)
+        except HashingBusyError:
+            return _busy()
+    if error:
+        return JSONResponse({'message': error}, status_code=401)
+    return JSONResponse({'message': 'Login successful', 'username': user.username})
+
+
+async def log_vehicle(request):
+    data = await _json_body(request) or {}
+    session_id = data.get('session_id')
+    direction = data.get('direction')
+    driver_name = data.get('driver_name', 'Unknown')
+
+    cached = vehicle_data_cache.get(session_id) if session_id else None
+    if cached is None:
+        return JSONResponse({'error': 'Invalid or expired session_id'}, status_code=400)
+    if direction not in ['inbound', 'outbound']:
+        return JSONResponse({'error': 'Invalid direction'}, status_code=400)
+
+    async with request.app.state.db.session() as session:
+        logs, logged = await session.run_sync(logs_from_upload, cached, direction, driver_name)
+        await commit_logs_async(session, logs)
+
+    vehicle_data_cache.pop(session_id, None)
+    return JSONResponse({
+        'message': 'Vehicle logged successfully',
+        'is_authorized': logged[0]['is_authorized'],
+        'vehicles': logged
+    })
+
+
+def _failed(what, exc):
+    logger.exception(f"Failed to retrieve {what}")
+    return JSONResponse({'status': 'error', 'message': f'Failed to retrieve {what}: {str(exc)}'}, status_code=500)
+
+
+async def authorized_vehicles(request):
+    try:
+        vehicles_data = await _read(request, stats_service.authorized_vehicles)
+        return JSONResponse({'status': 'success', 'count': len(vehicles_data), 'vehicles': vehicles_data})
+    except Exception as e:
+        return _failed('authorized vehicles', e)
+
+
+async def vehicle_stats(request):
+    try:
+        stats = await _stats(request, stats_service.archived_dashboard, stats_service.dashboard_stats)
+        return JSONResponse({'status': 'success', 'stats': stats})
+    except Exception as e:
+        return _failed('vehicle statistics', e)
+
+
+async def recent_movements(request):
+    try:
+        movements = await _read(request, stats_service.recent_movements)
+        return JSONResponse({'status': 'success', 'movements': movements})
+    except Exception as e:
+        return _failed('recent movements', e)
+
+
+async def vehicle_movements(request):
+    period = request.path_params['period']
+    if period not in stats_service.MOVEMENT_PERIODS:
+        return JSONResponse({'error': 'Invalid period. Use: today, 7days, monthly, yearly'}, status_code=400)
+    try:
+        movements = await _stats(
+            request, stats_service.archived_vehicle_movements, stats_service.vehicle_movements, period
+        )
+        return JSONResponse({'status': 'success', 'period': period, 'movements': movements})
+    except Exception as e:
+        return _failed('movement data', e)
+
+
+async def occupancy(request):
+    try:
+        overstay_hours = request.query_params.get('overstay_hours')
+        try:
+            overstay_hours = float(overstay_hours) if overstay_hours else None
+        except ValueError:
+            overstay_hours = None
+        if overstay_hours is None:
+            overstay_hours = request.app.state.config.get('OVERSTAY_HOURS', 12)
+        data = await _read(request, presence_service.occupancy, timedelta(hours=overstay_hours))
+        return JSONResponse({'status': 'success', **data})
+    except Exception as e:
+        return _failed('occupancy', e)
+
+
+async def vehicle_logs(request):
+    return JSONResponse(await _read(request, stats_service.latest_logs))
+
+
+async def vehicle_counts(request):
+    return JSONResponse(await _stats(request, stats_service.archived_direction_counts, stats_service.direction_counts))
+
+
+async def period_stats(request):
+    period = request.query_params.get('period', 'day')
+    if period not in stats_service.PERIODS:
+        return JSONResponse({'error': 'Invalid period'}, status_code=400)
+    return JSONResponse(await _stats(
+        request, stats_service.archived_period_counts, stats_service.period_counts, period
+    ))
+
+
+async def plate_search(request):
+    config = request.app.state.config
+    query = clean_plate(request.query_params.get('q', ''))
+    mode = request.query_params.get('mode', 'contains')
+    if not query:
+        return JSONResponse({'error': 'Query parameter q is required'}, status_code=400)
+    if mode not in plate_search_service.MODES:
+        return JSONResponse({'error': 'Invalid mode. Use: contains, fuzzy'}, status_code=400)
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+    except ValueError:
+        return JSONResponse({'error': 'limit must be an integer'}, status_code=400)
+
+    # plate_search_service.search in steps: SQL via run_sync, index scoring in a thread
+    min_similarity = config['PLATE_SEARCH_MIN_SIMILARITY']
+    try:
+        async with request.app.state.db.read_session() as reader:
+            if await reader.run_sync(plate_search_service.uses_trigram_index):
+                ranked = await reader.run_sync(
+                    plate_search_service.rank_postgres, query, mode, limit, min_similarity
+                )
+            else:
+                backlog = await reader.run_sync(plate_search_service.index_backlog)
+                ranked = await _offload(
+                    plate_search_service.rank_index, backlog, query, mode, limit, min_similarity
+                )
+            archived = await _offload(
+                plate_search_service.rank_archived, config['ARCHIVE_DIR'], query, mode, limit, min_similarity
+            )
+            ranked = plate_search_service.merge_ranked(limit, ranked, archived)
+            matches = await reader.run_sync(plate_search_service.with_events, ranked, config['PLATE_SEARCH_EVENTS'])
+        return JSONResponse({'status': 'success', 'query': query, 'mode': mode, 'matches': matches})
+    except Exception as e:
+        logger.exception("Plate search failed")
+        return JSONResponse({'status': 'error', 'message': f'Plate search failed: {str(e)}'}, status_code=500)
+
+
+async def live_movements(request):
+    """Same stream as the Flask endpoint, but each client is a coroutine, not a thread."""
+    last_event_id = request.headers.get('Last-Event-ID') or request.query_params.get('last_event_id')
+    after = live_events.resume_point(last_event_id)
+    heartbeat = request.app.state.config.get('SSE_HEARTBEAT_SECONDS', 15)
+    relay = request.app.state.relay
+
+    async def stream():
+        cursor = after
+        yield "retry: 3000\n\n"
+        if cursor is None:
+            # Too old or from a previous process: tell the client to refetch
+            cursor = live_events.latest()
+            yield RESYNC_FRAME
+        while True:
+            if await relay.wait(cursor, heartbeat):
+                cursor, frames = live_events.wait(cursor, 0)
+                if frames:
+                    yield ''.join(frames)
+            else:
+                yield ": keepalive\n\n"
+
+    return StreamingResponse(stream(), media_type='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+class RequestIdMiddleware:
+    """X-Request-ID handling for the async routes, as setup_logging does for Flask.
+
+    The id is written into the request headers before routing, so requests
+    that fall through to Flask keep it, and is bound to the log context for
+    the handlers served here.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        request_id = Headers(scope=scope).get('x-request-id')
+        if not request_id:
+            request_id = uuid.uuid4().hex
+            scope = dict(scope, headers=[*scope['headers'], (b'x-request-id', request_id.encode('latin-1'))])
+
+        async def send_with_id(message):
+            if message['type'] == 'http.response.start':
+                headers = MutableHeaders(scope=message)
+                if 'x-request-id' not in headers:
+                    headers['X-Request-ID'] = request_id
+            await send(message)
+
+        token = request_context.set((request_id, scope['path']))
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_context.reset(token)
+
+
+def create_asgi_app(flask_app=None):
+    flask_app = flask_app or create_app()
+    config = flask_app.config
+    database = AsyncDatabase(flask_app)
+    relay = AsyncEventRelay(live_events)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        relay.start()
+        try:
+            yield
+        finally:
+            relay.stop()
+            await database.dispose()
+
+    routes = [
+        Route('/api/auth/register', signup, methods=['POST']),
+        Route('/api/auth/login', login, methods=['POST']),
+        Route('/api/admin/log-vehicle', log_vehicle, methods=['POST']),
+        Route('/api/admin/authorized-vehicles', authorized_vehicles, methods=['GET']),
+        Route('/api/admin/vehicle-stats', vehicle_stats, methods=['GET']),
+        Route('/api/admin/recent-movements', recent_movements, methods=['GET']),
+        Route('/api/admin/occupancy', occupancy, methods=['GET']),
+        Route('/api/admin/vehicle-movements/{period}', vehicle_movements, methods=['GET']),
+        Route('/api/admin/plate-search', plate_search, methods=['GET']),
+        Route('/api/admin/live-movements', live_movements, methods=['GET']),
+        Route('/api/admin/api/vehicle-logs', vehicle_logs, methods=['GET']),
+        Route('/api/admin/api/vehicle-counts', vehicle_counts, methods=['GET']),
+        Route('/api/admin/api/vehicle-stats', period_stats, methods=['GET']),
+        # Everything else, inference included, is served by Flask on a2wsgi's threads
+        Mount('/', app=WSGIMiddleware(flask_app, workers=config.get('ASGI_WSGI_WORKERS', 16))),
+    ]
+    app = Starlette(
+        routes=routes,
+        middleware=[
+            Middleware(RequestIdMiddleware),
+            Middleware(
+                CORSMiddleware,
+                allow_origins=['http://localhost:5173'],
+                allow_credentials=True,
+                allow_methods=['*'],
+                allow_headers=['*']
+            )
+        ],
+        lifespan=lifespan
+    )
+    app.state.config = config
+    app.state.db = database
+    app.state.relay = relay
+    return app
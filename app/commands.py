@@ -0,0 +1,50 @@
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from .extensions import db
+from .services import archive_service, presence_service
+from .utils import model_registry
+
+models_cli = AppGroup('models', help='Manage local model files.')
+
+
+@models_cli.command('fetch')
+def fetch_models():
+    """Download all models into MODEL_DIR and write the checksum manifest."""
+    path = model_registry.fetch_models(
+        current_app.config['MODEL_DIR'],
+        current_app.config.get('MODEL_MANIFEST') or None
+    )
+    click.echo(f"Wrote model manifest to {path}")
+
+
+@models_cli.command('verify')
+def verify_models():
+    """Check every model listed in the manifest against its checksum."""
+    model_dir = current_app.config['MODEL_DIR']
+    manifest = current_app.config.get('MODEL_MANIFEST') or None
+    for name in model_registry.load_manifest(model_dir, manifest):
+        click.echo(f"{name}: {model_registry.resolve(name, model_dir, manifest)}")
+
+
+presence_cli = AppGroup('presence', help='Maintain the on-site occupancy table.')
+
+
+@presence_cli.command('rebuild')
+def rebuild_presence():
+    """Recompute vehicle_presence from the full gate history, archive included."""
+    count = presence_service.rebuild(db.session, archive_dir=current_app.config['ARCHIVE_DIR'])
+    click.echo(f"Rebuilt presence for {count} plates")
+
+
+archive_cli = AppGroup('archive', help='Move old gate events into the Parquet archive.')
+
+
+@archive_cli.command('run')
+@click.option('--older-than-days', type=click.IntRange(min=1), default=None,
+              help='Archive events older than this many days (default: ARCHIVE_AFTER_DAYS).')
+def run_archive(older_than_days):
+    """Archive VehicleLog rows past the retention age and delete them from the table."""
+    days = older_than_days if older_than_days is not None else current_app.config['ARCHIVE_AFTER_DAYS']
+    count = archive_service.archive_logs(db.session, current_app.config['ARCHIVE_DIR'], days)
+    click.echo(f"Archived {count} gate events older than {days} days")
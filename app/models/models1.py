@@ -1,15 +1,30 @@
 from ..extensions import db
 from datetime import datetime
+from sqlalchemy import DDL, event
 
 class VehicleLog(db.Model):
+    __table_args__ = (
+        # Trigram index for partial and fuzzy plate search; other databases use the in-app index
+        db.Index(
+            'ix_vehicle_log_license_plate_trgm', 'license_plate',
+            postgresql_using='gin',
+            postgresql_ops={'license_plate': 'gin_trgm_ops'}
+        ).ddl_if(dialect='postgresql'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     asset_id = db.Column(db.String(50), nullable=False)
     asset_name = db.Column(db.String(50), nullable=False)
     driver_name = db.Column(db.String(100), nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
-    image_path = db.Column(db.String(200), nullable=False)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    image_path = db.Column(db.String(200), nullable=False, index=True)
     # New fields for enhanced logging
-    license_plate = db.Column(db.String(20), nullable=True)
+    license_plate = db.Column(db.String(20), nullable=True, index=True)
     direction = db.Column(db.String(10), nullable=True)  # 'inbound' or 'outbound'
     is_authorized = db.Column(db.Boolean, nullable=True)
     vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id'), nullable=True)
+
+# gin_trgm_ops needs the extension before create_all builds the index
+event.listen(
+    VehicleLog.__table__, 'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+)
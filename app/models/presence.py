@@ -0,0 +1,17 @@
+from ..extensions import db
+
+class VehiclePresence(db.Model):
+    """Current on-site state per plate, updated as each gate event is logged."""
+    __tablename__ = 'vehicle_presence'
+    __table_args__ = (db.Index('ix_vehicle_presence_state_entered_at', 'state', 'entered_at'),)
+    license_plate = db.Column(db.String(20), primary_key=True)
+    state = db.Column(db.String(10), nullable=False)  # 'inside' / 'outside'
+    entered_at = db.Column(db.DateTime, nullable=True)
+    exited_at = db.Column(db.DateTime, nullable=True)
+    last_seen = db.Column(db.DateTime, nullable=False)
+    last_dwell_seconds = db.Column(db.Integer, nullable=True)
+    total_dwell_seconds = db.Column(db.Integer, nullable=False, default=0)
+    asset_name = db.Column(db.String(50), nullable=True)
+    is_authorized = db.Column(db.Boolean, nullable=True)
+    vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id'), nullable=True)
+    last_log_id = db.Column(db.Integer, nullable=True)
@@ -0,0 +1,7 @@
+from ..extensions import db
+
+class UserSession(db.Model):
+    __tablename__ = 'user_session'
+    id = db.Column(db.String(64), primary_key=True)
+    data = db.Column(db.LargeBinary, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
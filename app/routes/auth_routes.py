@@ -1,19 +1,40 @@
-from flask import Blueprint, request, jsonify
-from ..services.auth_service import register_user, login_user
+from flask import Blueprint, request, jsonify, current_app
+from ..services.auth_service import register_user, login_user, required_fields, rate_limit_wait
+from ..utils.hashing import HashingBusyError
 
 auth_bp = Blueprint('auth_bp', __name__)
 
+def _rate_limited(email=None):
+    """Return a 429 response if the client is over the auth rate limit, else None."""
+    wait = rate_limit_wait(current_app.config, request.remote_addr, email)
+    if wait is None:
+        return None
+    response = jsonify({'message': 'Too many attempts, please try again later'})
+    response.headers['Retry-After'] = str(wait)
+    return response, 429
+
+def _json_body():
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else {}
+
+def _busy():
+    return jsonify({'message': 'Server busy, please try again'}), 503
+
 @auth_bp.route('/register', methods=['POST'])
 def signup():
-    data = request.get_json()
-    username = data.get('username')
-    email = data.get('email')
-    password = data.get('password')
-
-    if not all([username, email, password]):
+    fields = required_fields(_json_body(), 'username', 'email', 'password')
+    if fields is None:
         return jsonify({'message': 'All fields are required'}), 400
+    username, email, password = fields
 
-    user, error = register_user(username, email, password)
+    limited = _rate_limited()
+    if limited:
+        return limited
+
+    try:
+        user, error = register_user(username, email, password)
+    except HashingBusyError:
+        return _busy()
     if error:
         return jsonify({'message': error}), 409
 
@@ -21,14 +42,20 @@ def signup():
 
 @auth_bp.route('/login', methods=['POST'])
 def login():
-    data = request.get_json()
-    email = data.get('email')
-    password = data.get('password')
-
-    if not all([email, password]):
+    fields = required_fields(_json_body(), 'email', 'password')
+    if fields is None:
         return jsonify({'message': 'Email and password required'}), 400
+    email, password = fields
+
+    # Reject abusive traffic before any bcrypt work is done
+    limited = _rate_limited(email)
+    if limited:
+        return limited
 
-    user, error = login_user(email, password)
+    try:
+        user, error = login_user(email, password)
+    except HashingBusyError:
+        return _busy()
     if error:
         return jsonify({'message': error}), 401
 
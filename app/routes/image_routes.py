@@ -2,47 +2,27 @@ import os
 import uuid
 import random
 import string
-import traceback
-from flask import Blueprint, request, jsonify, send_from_directory
-from ultralytics import YOLO
-from PIL import Image
-import easyocr
-import numpy as np
-from app.models.models1 import VehicleLog
-from app.models.vehicle import Vehicle
+from flask import Blueprint, request, jsonify, send_from_directory, current_app
 from app.extensions import db
-from datetime import datetime
-from sqlalchemy import func
-from huggingface_hub import hf_hub_download
+from app.services.inference_service import open_frame
+from app.services.detection_service import detect_frame, PLATE_FIELDS
+from app.services.log_service import commit_logs, logs_from_upload
+from app.services import stats_service
+from app.utils.db_routing import read_session
+from app.utils.plate_format import ASSET_ID_PREFIX
+from app.utils.logger import get_logger, StageTimer
 
 image_bp = Blueprint('image_bp', __name__)
-
-yolo_model = hf_hub_download(
-    repo_id="balaji2003/yolov8x-model",
-    filename="yolov8x.pt"
-)
-
-license_model = hf_hub_download(
-    repo_id="balaji2003/yolov8x-model",
-    filename="license_plate_detector.pt"
-)
-
-# Load models
-vehicle_model = YOLO(yolo_model)
-plate_model = YOLO(license_model)
-
-# Initialize EasyOCR
-reader = easyocr.Reader(['en'], gpu=False)
+logger = get_logger(__name__)
 
 UPLOAD_FOLDER = 'uploads'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 vehicle_data_cache = {}
 
 def generate_asset_id():
-    prefix = "ASSET"
     part1 = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
     part2 = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
-    return f"{prefix}-{part1}-{part2}"
+    return f"{ASSET_ID_PREFIX}{part1}-{part2}"
 
 @image_bp.route('/uploads/<filename>')
 def uploaded_file(filename):
@@ -61,62 +41,63 @@ def upload_image():
     unique_filename = f"{uuid.uuid4().hex}{file_extension}"
     image_path = os.path.join(UPLOAD_FOLDER, unique_filename)
 
+    timer = StageTimer()
     try:
-        print("Saving uploaded image to:", image_path)
-        image.save(image_path)
-
-        # Step 1: Detect vehicle
-        print("Running vehicle detection...")
-        results = vehicle_model(image_path)
-        boxes = results[0].boxes.data.cpu().numpy()
-
-        if boxes.shape[0] == 0:
+        with timer('save'):
+            image.save(image_path)
+
+        with timer('decode'):
+            frame = open_frame(image_path)
+
+        # Steps 1-3: Detect every vehicle and plate, OCR all plates in one batch
+        with timer('detection'), frame:
+            detections = detect_frame(frame)
+        vehicles = [d for d in detections if d['vehicle_box'] is not None]
+        loose_plates = [d for d in detections if d['vehicle_box'] is None and d['plate_text']]
+        if len(vehicles) == 1 and not vehicles[0]['plate_text'] and loose_plates:
+            # A lone vehicle owns any plate in the frame, even one its box only partly covers
+            best = max(loose_plates, key=lambda d: d['plate_confidence'])
+            vehicles[0].update({key: best[key] for key in PLATE_FIELDS})
+
+        if not vehicles:
+            logger.info("No vehicle detected", extra={'image_path': image_path, 'timings': timer.timings})
             return jsonify({"error": "No vehicle detected in the image"}), 400
 
-        class_id = int(results[0].boxes.cls[0])
-        confidence = float(results[0].boxes.conf[0])
-        class_map = {
-            0: "Person", 1: "Bicycle", 2: "Car", 3: "Motorcycle", 
-            5: "Bus", 7: "Truck"
-        }
-        asset_name = class_map.get(class_id, f"Unknown-{class_id}")
-
-        # Step 2: Detect license plate
-        print("Running license plate detection...")
-        plate_results = plate_model(image_path)
-        plate_boxes = plate_results[0].boxes.data.cpu().numpy()
-        plate_number = None
-
-        if plate_boxes.shape[0] > 0:
-            xyxy = plate_results[0].boxes.xyxy[0].cpu().numpy().astype(int)
-            x1, y1, x2, y2 = xyxy
-            print(f"Cropping license plate from: ({x1}, {y1}) to ({x2}, {y2})")
-            pil_img = Image.open(image_path)
-            plate_crop = pil_img.crop((x1, y1, x2, y2))
-
-            # Step 3: OCR on cropped plate
-            print("Performing OCR on license plate...")
-            plate_crop_np = np.array(plate_crop)
-            ocr_results = reader.readtext(plate_crop_np)
-
-            if ocr_results:
-                plate_number = ocr_results[0][1].replace(" ", "").upper()
-                print("Detected license plate number:", plate_number)
-            else:
-                print("OCR failed to detect plate number.")
-
-        # Step 4: Set asset ID
-        asset_id = plate_number if plate_number else generate_asset_id()
+        # Step 4: Set asset ID per vehicle
+        for vehicle in vehicles:
+            vehicle['asset_id'] = vehicle['plate_text'] or generate_asset_id()
+
+        primary = vehicles[0]
+        asset_id = primary['asset_id']
+        asset_name = primary['asset_name']
+        confidence = primary['confidence']
+        class_id = primary['class_id']
         image_path_for_frontend = image_path.replace("\\", "/")
         image_url = f"http://localhost:5000/{image_path_for_frontend}"
         session_id = str(uuid.uuid4())
 
+        logger.info("Vehicle image processed", extra={
+            'session_id': session_id,
+            'plates': [v['plate_text'] for v in vehicles],
+            'vehicle_count': len(vehicles),
+            'timings': timer.timings
+        })
+
         vehicle_data_cache[session_id] = {
             "asset_id": asset_id,
             "asset_name": asset_name,
-            "image_path": image_path_for_frontend
+            "image_path": image_path_for_frontend,
+            "vehicles": [
+                {"asset_id": v['asset_id'], "asset_name": v['asset_name']}
+                for v in vehicles
+            ]
         }
 
+        if len(vehicles) > 1:
+            message = f"{len(vehicles)} vehicles detected"
+        else:
+            message = f"Vehicle detected: {asset_name} (confidence: {confidence:.1%})"
+
         return jsonify({
             "session_id": session_id,
             "asset_id": asset_id,
@@ -125,13 +106,24 @@ def upload_image():
             "image_url": image_url,
             "confidence": round(confidence, 3),
             "detected_class_id": class_id,
-            "message": f"Vehicle detected: {asset_name} (confidence: {confidence:.1%})",
+            "vehicles": [
+                {
+                    "asset_id": v['asset_id'],
+                    "asset_name": v['asset_name'],
+                    "confidence": round(v['confidence'], 3),
+                    "detected_class_id": v['class_id'],
+                    "vehicle_box": v['vehicle_box'],
+                    "plate_box": v['plate_box']
+                }
+                for v in vehicles
+            ],
+            "message": message,
             "auto_filled": True,
             "next_step": "Review and edit the auto-filled data, then submit with driver name"
         }), 200
 
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Vehicle detection failed", extra={'image_path': image_path, 'timings': timer.timings})
         try:
             os.remove(image_path)
         except:
@@ -150,80 +142,31 @@ def log_vehicle():
     if direction not in ['inbound', 'outbound']:
         return jsonify({'error': 'Invalid direction'}), 400
 
-    cached = vehicle_data_cache[session_id]
-    license_plate = cached['asset_id']
-    asset_name = cached['asset_name']
-    image_path = cached['image_path']
-
-    # Find vehicle in DB
-    vehicle = Vehicle.query.filter_by(license_plate=license_plate).first()
-    is_authorized = vehicle.authorized if vehicle else False
-    vehicle_id = vehicle.id if vehicle else None
-
-    log = VehicleLog(
-        asset_id=license_plate,
-        asset_name=asset_name,
-        driver_name=driver_name,
-        timestamp=datetime.utcnow(),
-        image_path=image_path,
-        license_plate=license_plate,
-        direction=direction,
-        is_authorized=is_authorized,
-        vehicle_id=vehicle_id
-    )
-    db.session.add(log)
-    db.session.commit()
+    logs, logged = logs_from_upload(db.session, vehicle_data_cache[session_id], direction, driver_name)
+    commit_logs(logs)
 
     # Optionally, remove from cache
     del vehicle_data_cache[session_id]
 
-    return jsonify({'message': 'Vehicle logged successfully', 'is_authorized': is_authorized})
+    return jsonify({
+        'message': 'Vehicle logged successfully',
+        'is_authorized': logged[0]['is_authorized'],
+        'vehicles': logged
+    })
 
 @image_bp.route('/api/vehicle-logs', methods=['GET'])
 def get_vehicle_logs():
-    logs = VehicleLog.query.order_by(VehicleLog.timestamp.desc()).limit(50).all()
-    return jsonify([
-        {
-            'license_plate': log.license_plate,
-            'direction': log.direction,
-            'timestamp': log.timestamp.isoformat(),
-            'is_authorized': log.is_authorized,
-            'image_path': log.image_path,
-            'driver_name': log.driver_name,
-            'asset_name': log.asset_name
-        }
-        for log in logs
-    ])
+    return jsonify(stats_service.latest_logs(read_session()))
 
 @image_bp.route('/api/vehicle-counts', methods=['GET'])
 def get_vehicle_counts():
-    inbound = VehicleLog.query.filter_by(direction='inbound').count()
-    outbound = VehicleLog.query.filter_by(direction='outbound').count()
-    return jsonify({'inbound': inbound, 'outbound': outbound})
+    archived = stats_service.archived_direction_counts(current_app.config['ARCHIVE_DIR'])
+    return jsonify(stats_service.direction_counts(read_session(), archived))
 
 @image_bp.route('/api/vehicle-stats', methods=['GET'])
 def get_vehicle_stats():
     period = request.args.get('period', 'day')
-    if period == 'day':
-        group_by = func.date(VehicleLog.timestamp)
-    elif period == 'week':
-        group_by = func.date_trunc('week', VehicleLog.timestamp)
-    elif period == 'month':
-        group_by = func.date_trunc('month', VehicleLog.timestamp)
-    else:
+    if period not in stats_service.PERIODS:
         return jsonify({'error': 'Invalid period'}), 400
-
-    results = db.session.query(
-        group_by.label('period'),
-        VehicleLog.direction,
-        func.count().label('count')
-    ).group_by(group_by, VehicleLog.direction).order_by(group_by).all()
-
-    stats = {}
-    for row in results:
-        key = str(row.period)
-        if key not in stats:
-            stats[key] = {'inbound': 0, 'outbound': 0}
-        stats[key][row.direction] = row.count
-
-    return jsonify(stats)
+    archived = stats_service.archived_period_counts(current_app.config['ARCHIVE_DIR'], period)
+    return jsonify(stats_service.period_counts(read_session(), archived))
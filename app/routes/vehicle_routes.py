@@ -1,50 +1,30 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, current_app, stream_with_context
 from app.models.models1 import VehicleLog
 from app.models.vehicle import Vehicle
 from app.extensions import db
 import os
 from datetime import datetime, timedelta
-from ultralytics import YOLO
-from PIL import Image
-import easyocr
-import numpy as np
 import re
-from huggingface_hub import hf_hub_download
+import csv
+import heapq
+import threading
+import io
+from sqlalchemy import select
+from app.services.inference_service import open_frame
+from app.services.detection_service import detect_frame
+from app.services.log_service import commit_logs
+from app.services import archive_service, presence_service, plate_search_service, stats_service
+from app.utils.db_routing import read_session
+from app.utils.event_bus import RESYNC_FRAME, live_events
+from app.utils.debounce import gate_debouncer
+from app.utils.logger import get_logger, StageTimer
 
 vehicle_bp = Blueprint('vehicle_bp', __name__)
+logger = get_logger(__name__)
 
-yolo_model = hf_hub_download(
-    repo_id="balaji2003/yolov8x-model",
-    filename="yolov8x.pt"
-)
-
-license_model = hf_hub_download(
-    repo_id="balaji2003/yolov8x-model",
-    filename="license_plate_detector.pt"
-)
-
-# Load models for detection
-vehicle_model = YOLO(yolo_model)
-plate_model = YOLO(license_model)
-reader = easyocr.Reader(['en'], gpu=False)
 UPLOAD_FOLDER = 'uploads'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-def detect_plate_from_image(image_path):
-    plate_results = plate_model(image_path)
-    plate_boxes = plate_results[0].boxes.data.cpu().numpy()
-    plate_number = None
-    if plate_boxes.shape[0] > 0:
-        xyxy = plate_results[0].boxes.xyxy[0].cpu().numpy().astype(int)
-        x1, y1, x2, y2 = xyxy
-        pil_img = Image.open(image_path)
-        plate_crop = pil_img.crop((x1, y1, x2, y2))
-        plate_crop_np = np.array(plate_crop)
-        ocr_results = reader.readtext(plate_crop_np)
-        if ocr_results:
-            plate_number = ocr_results[0][1].replace(" ", "").upper()
-    return plate_number
-
 def clean_plate(plate):
     return re.sub(r'[^A-Z0-9]', '', plate.upper())
 
@@ -63,25 +43,27 @@ def register_vehicle_preview():
     image.save(image_path)
     
     try:
-        # Detect vehicle type using YOLO
-        results = vehicle_model(image_path)
-        boxes = results[0].boxes.data.cpu().numpy()
-        vehicle_type = None
+        # Detect vehicles and plates using YOLO, OCR all plates in one batch
+        with open_frame(image_path) as frame:
+            detections = detect_frame(frame)
+
+        # Prefer a vehicle whose plate was read, then any vehicle, then a bare plate
+        primary = next(
+            (d for d in detections if d['vehicle_box'] is not None and d['plate_text']),
+            next((d for d in detections if d['vehicle_box'] is not None), detections[0] if detections else None)
+        )
+        vehicle_type = "Unknown"
         confidence = 0.0
+        class_id = None
+        plate_number = None
+
+        if primary is not None:
+            if primary['vehicle_box'] is not None:
+                class_id = primary['class_id']
+                confidence = primary['confidence']
+                vehicle_type = primary['asset_name']
+            plate_number = primary['plate_text']
         
-        if boxes.shape[0] > 0:
-            class_id = int(results[0].boxes.cls[0])
-            confidence = float(results[0].boxes.conf[0])
-            class_map = {
-                0: "Person", 1: "Bicycle", 2: "Car", 3: "Motorcycle", 
-                5: "Bus", 7: "Truck"
-            }
-            vehicle_type = class_map.get(class_id, f"Unknown-{class_id}")
-        else:
-            vehicle_type = "Unknown"
-        
-        # Detect license plate
-        plate_number = detect_plate_from_image(image_path)
         license_plate = clean_plate(plate_number) if plate_number else None
         
         return jsonify({
@@ -89,10 +71,20 @@ def register_vehicle_preview():
             'license_plate': license_plate,
             'image_path': image_path,
             'confidence': round(confidence, 3),
-            'detected_class_id': int(results[0].boxes.cls[0]) if boxes.shape[0] > 0 else None
+            'detected_class_id': class_id,
+            'detections': [
+                {
+                    'vehicle_type': d['asset_name'],
+                    'license_plate': clean_plate(d['plate_text']) if d['plate_text'] else None,
+                    'confidence': round(d['confidence'], 3) if d['confidence'] is not None else None,
+                    'vehicle_box': d['vehicle_box'],
+                    'plate_box': d['plate_box']
+                }
+                for d in detections
+            ]
         }), 200
     except Exception as e:
-        print(f"Error in register preview: {str(e)}")
+        logger.exception("Register preview failed", extra={'image_path': image_path})
         return jsonify({'error': f'Vehicle detection failed: {str(e)}'}), 500
 
 # Vehicle Registration
@@ -145,6 +137,7 @@ def check_vehicle():
     
     image = request.files['image']
     direction = request.form['direction']
+    lane = request.form.get('lane', 'default')
     
     if image.filename == '':
         return jsonify({'error': 'No image selected'}), 400
@@ -152,81 +145,179 @@ def check_vehicle():
     file_extension = os.path.splitext(image.filename)[1]
     unique_filename = f"check_{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}{file_extension}"
     image_path = os.path.join(UPLOAD_FOLDER, unique_filename)
-    image.save(image_path)
+    timer = StageTimer()
+    with timer('save'):
+        image.save(image_path)
     
     try:
-        # Detect license plate from image
-        plate_number = detect_plate_from_image(image_path)
-        print("[CHECK] Detected plate (raw):", plate_number)
+        # Detect and read every license plate in the image
+        with timer('decode'):
+            frame = open_frame(image_path)
+        with timer('plate_detection'), frame:
+            detections = detect_frame(frame, with_vehicles=False)
+        
+        # Clean and normalize detected plates, keeping the best capture per plate
+        plates = {}
+        for detection in detections:
+            plate_number = clean_plate(detection['plate_text']) if detection['plate_text'] else ''
+            if plate_number:
+                confidence = (detection['plate_confidence'] or 0.0) * (detection['ocr_confidence'] or 0.0)
+                plates[plate_number] = max(confidence, plates.get(plate_number, 0.0))
         
-        if not plate_number:
+        if not plates:
+            logger.info("No license plate detected", extra={
+                'image_path': image_path, 'direction': direction, 'timings': timer.timings
+            })
             return jsonify({'error': 'No license plate detected'}), 400
         
-        # Clean and normalize detected plate
-        plate_number = clean_plate(plate_number)
-        print("[CHECK] Detected plate (normalized):", plate_number)
+        # Fold repeats of the same plate/direction/lane within the debounce window
+        window = current_app.config.get('GATE_DEBOUNCE_SECONDS', 0)
+        claims = {
+            plate_number: gate_debouncer.claim((plate_number, direction, lane), window, confidence)
+            if window > 0 else None
+            for plate_number, confidence in plates.items()
+        }
         
-        # Check if vehicle exists in database
-        vehicle = Vehicle.query.filter_by(license_plate=plate_number).first()
-        is_authorized = vehicle.authorized if vehicle else False
+        claimed = [(p, direction, lane) for p, duplicate in claims.items() if duplicate is None and window > 0]
         
-        # Determine message based on authorization status
-        if is_authorized:
-            message = '✅ Authorized Vehicle'
-            status = 'authorized'
-        else:
-            message = '❌ Unauthorized Vehicle Detected'
-            status = 'unauthorized'
+        timestamp = datetime.utcnow()
+        logs = []
+        pending = []
+        image_updates = []
+        results = []
+        try:
+            # Check which vehicles exist in database (repeats answer from memory)
+            lookup = [p for p, duplicate in claims.items() if duplicate is None or duplicate['result'] is None]
+            known = {}
+            if lookup:
+                with timer('lookup'):
+                    known = {
+                        vehicle.license_plate: vehicle
+                        for vehicle in Vehicle.query.filter(Vehicle.license_plate.in_(lookup)).all()
+                    }
+            
+            for plate_number, duplicate in claims.items():
+                key = (plate_number, direction, lane)
+                if duplicate is not None and duplicate['result'] is not None:
+                    result = dict(duplicate['result'], duplicate=True, log_id=duplicate['log_id'])
+                    if (current_app.config.get('GATE_DEBOUNCE_KEEP_BEST_IMAGE', True)
+                            and gate_debouncer.improve(key, plates[plate_number])):
+                        image_updates.append(duplicate['log_id'])
+                    results.append(result)
+                    continue
+                
+                vehicle = known.get(plate_number)
+                is_authorized = vehicle.authorized if vehicle else False
+                
+                # Determine message based on authorization status
+                if is_authorized:
+                    message = '✅ Authorized Vehicle'
+                    status = 'authorized'
+                else:
+                    message = '❌ Unauthorized Vehicle Detected'
+                    status = 'unauthorized'
+                
+                result = {
+                    'license_plate': plate_number,
+                    'is_authorized': is_authorized,
+                    'message': message,
+                    'status': status,
+                    'vehicle_type': vehicle.vehicle_type if vehicle else 'Unknown',
+                    'direction': direction,
+                    'duplicate': duplicate is not None,
+                    'log_id': None
+                }
+                results.append(result)
+                if duplicate is not None:
+                    # Repeat of an event still being committed by another request
+                    continue
+                
+                # Log the vehicle check
+                logs.append(VehicleLog(
+                    asset_id=plate_number,
+                    asset_name=vehicle.vehicle_type if vehicle else 'Unknown',
+                    driver_name='Gate Check',
+                    timestamp=timestamp,
+                    image_path=image_path,
+                    license_plate=plate_number,
+                    direction=direction,
+                    is_authorized=is_authorized,
+                    vehicle_id=vehicle.id if vehicle else None
+                ))
+                pending.append((key, result))
+            
+            with timer('commit'):
+                if logs:
+                    events = commit_logs(logs)
+                    for (key, result), event in zip(pending, events):
+                        result['log_id'] = event['id']
+                        gate_debouncer.bind(key, event['id'], {
+                            k: v for k, v in result.items() if k not in ('duplicate', 'log_id')
+                        })
+                    claimed = []
+                if image_updates:
+                    superseded = set(db.session.execute(
+                        select(VehicleLog.image_path).where(VehicleLog.id.in_(image_updates))
+                    ).scalars())
+                    VehicleLog.query.filter(VehicleLog.id.in_(image_updates)).update(
+                        {'image_path': image_path}, synchronize_session=False
+                    )
+                    db.session.commit()
+        except Exception:
+            db.session.rollback()
+            for key in claimed:
+                gate_debouncer.release(key)
+            raise
         
-        print(f"[CHECK] is_authorized: {is_authorized}, message: {message}")
+        if image_updates:
+            _remove_unreferenced(superseded - {image_path})
         
-        # Log the vehicle check
-        log = VehicleLog(
-            asset_id=plate_number,
-            asset_name=vehicle.vehicle_type if vehicle else 'Unknown',
-            driver_name='Gate Check',
-            timestamp=datetime.utcnow(),
-            image_path=image_path,
-            license_plate=plate_number,
-            direction=direction,
-            is_authorized=is_authorized,
-            vehicle_id=vehicle.id if vehicle else None
-        )
-        db.session.add(log)
-        db.session.commit()
+        # Every plate was a repeat and no image was kept: don't store the upload
+        if not logs and not image_updates:
+            try:
+                os.remove(image_path)
+            except OSError:
+                pass
         
-        return jsonify({
-            'license_plate': plate_number,
-            'is_authorized': is_authorized,
-            'message': message,
-            'status': status,
-            'vehicle_type': vehicle.vehicle_type if vehicle else 'Unknown',
-            'direction': direction
-        }), 200
+        logger.info("Gate check", extra={
+            'plates': list(plates),
+            'duplicates': [r['license_plate'] for r in results if r['duplicate']],
+            'lane': lane,
+            'raw_plates': [d['plate_text'] for d in detections],
+            'direction': direction,
+            'authorized': [r['is_authorized'] for r in results],
+            'timings': timer.timings
+        })
+        
+        response = dict(results[0])
+        response['vehicles'] = results
+        return jsonify(response), 200
         
     except Exception as e:
-        print(f"Error in vehicle check: {str(e)}")
+        logger.exception("Vehicle check failed", extra={
+            'image_path': image_path, 'direction': direction, 'timings': timer.timings
+        })
         return jsonify({'error': f'Vehicle check failed: {str(e)}'}), 500
 
+def _remove_unreferenced(paths):
+    """Delete uploads no VehicleLog points at any more (multi-plate frames share one file)."""
+    for path in paths:
+        still_used = db.session.execute(
+            select(VehicleLog.id).where(VehicleLog.image_path == path).limit(1)
+        ).first()
+        if still_used:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
 # Get all authorized vehicles
 @vehicle_bp.route('/authorized-vehicles', methods=['GET'])
 def get_authorized_vehicles():
     """Get all authorized vehicles from the database"""
     try:
-        vehicles = Vehicle.query.filter_by(authorized=True).all()
-        vehicles_data = []
-        
-        for vehicle in vehicles:
-            vehicles_data.append({
-                'id': vehicle.id,
-                'license_plate': vehicle.license_plate,
-                'vehicle_type': vehicle.vehicle_type,
-                'color': vehicle.color,
-                'owner_name': vehicle.owner_name,
-                'authorized': vehicle.authorized,
-                'added_on': vehicle.added_on.isoformat() if vehicle.added_on else None
-            })
-        
+        vehicles_data = stats_service.authorized_vehicles(read_session())
         return jsonify({
             'status': 'success',
             'count': len(vehicles_data),
@@ -243,41 +334,9 @@ def get_authorized_vehicles():
 def get_vehicle_stats():
     """Get vehicle statistics for dashboard charts"""
     try:
-        # Total authorized vehicles
-        total_authorized = Vehicle.query.filter_by(authorized=True).count()
-        
-        # Vehicle types distribution
-        vehicle_types = db.session.query(
-            Vehicle.vehicle_type, 
-            db.func.count(Vehicle.id)
-        ).filter_by(authorized=True).group_by(Vehicle.vehicle_type).all()
-        
-        # Recent vehicle logs (last 24 hours)
-        yesterday = datetime.utcnow() - timedelta(days=1)
-        recent_logs = VehicleLog.query.filter(
-            VehicleLog.timestamp >= yesterday
-        ).count()
-        
-        # Authorized vs unauthorized entries
-        authorized_entries = VehicleLog.query.filter_by(is_authorized=True).count()
-        unauthorized_entries = VehicleLog.query.filter_by(is_authorized=False).count()
-        
-        # Inbound vs Outbound statistics
-        inbound_count = VehicleLog.query.filter_by(direction='inbound').count()
-        outbound_count = VehicleLog.query.filter_by(direction='outbound').count()
-        
-        return jsonify({
-            'status': 'success',
-            'stats': {
-                'total_authorized_vehicles': total_authorized,
-                'vehicle_types_distribution': dict(vehicle_types),
-                'recent_entries_24h': recent_logs,
-                'authorized_entries': authorized_entries,
-                'unauthorized_entries': unauthorized_entries,
-                'inbound_count': inbound_count,
-                'outbound_count': outbound_count
-            }
-        }), 200
+        archived = stats_service.archived_dashboard(current_app.config['ARCHIVE_DIR'])
+        stats = stats_service.dashboard_stats(read_session(), archived)
+        return jsonify({'status': 'success', 'stats': stats}), 200
     except Exception as e:
         return jsonify({
             'status': 'error',
@@ -290,22 +349,7 @@ def get_recent_movements():
     """Get recent vehicle inbound/outbound movements"""
     try:
         # Get last 20 vehicle movements
-        recent_movements = VehicleLog.query.filter(
-            VehicleLog.direction.in_(['inbound', 'outbound'])
-        ).order_by(VehicleLog.timestamp.desc()).limit(20).all()
-        
-        movements_data = []
-        for movement in recent_movements:
-            movements_data.append({
-                'id': movement.id,
-                'license_plate': movement.license_plate,
-                'vehicle_type': movement.asset_name,
-                'direction': movement.direction,
-                'is_authorized': movement.is_authorized,
-                'timestamp': movement.timestamp.isoformat(),
-                'driver_name': movement.driver_name,
-                'image_path': movement.image_path
-            })
+        movements_data = stats_service.recent_movements(read_session())
         
         return jsonify({
             'status': 'success',
@@ -317,132 +361,82 @@ def get_recent_movements():
             'message': f'Failed to retrieve recent movements: {str(e)}'
         }), 500
 
+# Vehicles currently on site
+@vehicle_bp.route('/occupancy', methods=['GET'])
+def get_occupancy():
+    """Get vehicles currently inside, overstays and unauthorized vehicles on site"""
+    try:
+        overstay_hours = request.args.get('overstay_hours', type=float)
+        if overstay_hours is None:
+            overstay_hours = current_app.config.get('OVERSTAY_HOURS', 12)
+        data = presence_service.occupancy(read_session(), timedelta(hours=overstay_hours))
+        return jsonify({'status': 'success', **data}), 200
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Failed to retrieve occupancy: {str(e)}'
+        }), 500
+
+# Live feed of new vehicle movements (server-sent events)
+@vehicle_bp.route('/live-movements', methods=['GET'])
+def live_movements():
+    """Stream each new VehicleLog as it is committed, resumable via Last-Event-ID.
+
+    Under a WSGI server every open stream occupies a worker thread for as
+    long as the client stays connected, so at most SSE_MAX_STREAMS run at
+    once and further clients get 503. Serving many dashboards cheaply
+    needs the ASGI mode (asgi.py), where this route is a coroutine.
+    """
+    if not _acquire_stream_slot(current_app.config.get('SSE_MAX_STREAMS', 32)):
+        response = jsonify({'error': 'Too many live streams open, try again later'})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    after = live_events.resume_point(last_event_id)
+    heartbeat = current_app.config.get('SSE_HEARTBEAT_SECONDS', 15)
+
+    def stream():
+        cursor = after
+        yield "retry: 3000\n\n"
+        if cursor is None:
+            # Too old or from a previous process: tell the client to refetch
+            cursor = live_events.latest()
+            yield RESYNC_FRAME
+        while True:
+            cursor, frames = live_events.wait(cursor, heartbeat)
+            if frames:
+                yield ''.join(frames)
+            else:
+                yield ": keepalive\n\n"
+
+    response = Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # The server closes the response once the client has gone, even if streaming never started
+    response.call_on_close(_stream_slots.release)
+    return response
+
+_stream_slots = None
+_stream_slots_lock = threading.Lock()
+
+def _acquire_stream_slot(limit):
+    global _stream_slots
+    with _stream_slots_lock:
+        if _stream_slots is None:
+            _stream_slots = threading.BoundedSemaphore(limit)
+    return _stream_slots.acquire(blocking=False)
+
 # Get vehicle movement data for different time periods
 @vehicle_bp.route('/vehicle-movements/<period>', methods=['GET'])
 def get_vehicle_movements(period):
     """Get vehicle movement data for different time periods"""
+    if period not in stats_service.MOVEMENT_PERIODS:
+        return jsonify({'error': 'Invalid period. Use: today, 7days, monthly, yearly'}), 400
     try:
-        now = datetime.utcnow()
-        
-        if period == 'today':
-            # Today's data by hour
-            start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            end_date = start_date + timedelta(days=1)
-            
-            movements = []
-            for hour in range(24):
-                hour_start = start_date + timedelta(hours=hour)
-                hour_end = hour_start + timedelta(hours=1)
-                
-                inbound_count = VehicleLog.query.filter(
-                    VehicleLog.direction == 'inbound',
-                    VehicleLog.timestamp >= hour_start,
-                    VehicleLog.timestamp < hour_end
-                ).count()
-                
-                outbound_count = VehicleLog.query.filter(
-                    VehicleLog.direction == 'outbound',
-                    VehicleLog.timestamp >= hour_start,
-                    VehicleLog.timestamp < hour_end
-                ).count()
-                
-                movements.append({
-                    'label': f'{hour:02d}:00',
-                    'inbound': inbound_count,
-                    'outbound': outbound_count
-                })
-                
-        elif period == '7days':
-            # Last 7 days data
-            movements = []
-            for i in range(7):
-                date = now - timedelta(days=i)
-                start_of_day = date.replace(hour=0, minute=0, second=0, microsecond=0)
-                end_of_day = start_of_day + timedelta(days=1)
-                
-                inbound_count = VehicleLog.query.filter(
-                    VehicleLog.direction == 'inbound',
-                    VehicleLog.timestamp >= start_of_day,
-                    VehicleLog.timestamp < end_of_day
-                ).count()
-                
-                outbound_count = VehicleLog.query.filter(
-                    VehicleLog.direction == 'outbound',
-                    VehicleLog.timestamp >= start_of_day,
-                    VehicleLog.timestamp < end_of_day
-                ).count()
-                
-                movements.append({
-                    'label': start_of_day.strftime('%a'),
-                    'date': start_of_day.strftime('%Y-%m-%d'),
-                    'inbound': inbound_count,
-                    'outbound': outbound_count
-                })
-            movements.reverse()
-            
-        elif period == 'monthly':
-            # Last 12 months data
-            movements = []
-            for i in range(12):
-                date = now - timedelta(days=30*i)
-                start_of_month = date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-                if i == 0:
-                    end_of_month = now
-                else:
-                    next_month = start_of_month + timedelta(days=32)
-                    end_of_month = next_month.replace(day=1) - timedelta(days=1)
-                
-                inbound_count = VehicleLog.query.filter(
-                    VehicleLog.direction == 'inbound',
-                    VehicleLog.timestamp >= start_of_month,
-                    VehicleLog.timestamp <= end_of_month
-                ).count()
-                
-                outbound_count = VehicleLog.query.filter(
-                    VehicleLog.direction == 'outbound',
-                    VehicleLog.timestamp >= start_of_month,
-                    VehicleLog.timestamp <= end_of_month
-                ).count()
-                
-                movements.append({
-                    'label': start_of_month.strftime('%b %Y'),
-                    'date': start_of_month.strftime('%Y-%m'),
-                    'inbound': inbound_count,
-                    'outbound': outbound_count
-                })
-            movements.reverse()
-            
-        elif period == 'yearly':
-            # Last 5 years data
-            movements = []
-            for i in range(5):
-                year = now.year - i
-                start_of_year = datetime(year, 1, 1)
-                end_of_year = datetime(year, 12, 31, 23, 59, 59)
-                
-                inbound_count = VehicleLog.query.filter(
-                    VehicleLog.direction == 'inbound',
-                    VehicleLog.timestamp >= start_of_year,
-                    VehicleLog.timestamp <= end_of_year
-                ).count()
-                
-                outbound_count = VehicleLog.query.filter(
-                    VehicleLog.direction == 'outbound',
-                    VehicleLog.timestamp >= start_of_year,
-                    VehicleLog.timestamp <= end_of_year
-                ).count()
-                
-                movements.append({
-                    'label': str(year),
-                    'date': str(year),
-                    'inbound': inbound_count,
-                    'outbound': outbound_count
-                })
-            movements.reverse()
-            
-        else:
-            return jsonify({'error': 'Invalid period. Use: today, 7days, monthly, yearly'}), 400
-        
+        archived = stats_service.archived_vehicle_movements(current_app.config['ARCHIVE_DIR'], period)
+        movements = stats_service.vehicle_movements(read_session(), archived)
         return jsonify({
             'status': 'success',
             'period': period,
@@ -454,3 +448,103 @@ def get_vehicle_movements(period):
             'status': 'error',
             'message': f'Failed to retrieve movement data: {str(e)}'
         }), 500
+
+
+EXPORT_COLUMNS = archive_service.ARCHIVE_COLUMNS
+
+
+def _csv_line(values):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
+
+
+def _export_order(values):
+    return values[EXPORT_COLUMNS.index('timestamp')], values[EXPORT_COLUMNS.index('id')]
+
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d') if value else None
+
+
+@vehicle_bp.route('/vehicle-logs/export', methods=['GET'])
+def export_vehicle_logs():
+    """Stream gate events as CSV, archived and live, in timestamp order.
+
+    Optional `start` and `end` (YYYY-MM-DD, both inclusive) bound the range.
+    """
+    try:
+        start = _parse_date(request.args.get('start'))
+        end = _parse_date(request.args.get('end'))
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+    if end:
+        end += timedelta(days=1)
+
+    archive_dir = current_app.config['ARCHIVE_DIR']
+    live = archive_service.live_condition(archive_dir)
+    reader = read_session()
+
+    query = reader.query(VehicleLog).order_by(VehicleLog.timestamp, VehicleLog.id)
+    if start:
+        query = query.filter(VehicleLog.timestamp >= start)
+    if end:
+        query = query.filter(VehicleLog.timestamp < end)
+    if live is not None:
+        # Rows already archived are served from the archive
+        query = query.filter(live)
+
+    def generate():
+        yield _csv_line(EXPORT_COLUMNS)
+        archived = (
+            [row[name] for name in EXPORT_COLUMNS]
+            for row in archive_service.iter_rows(archive_dir, start, end)
+        )
+        current = ([getattr(log, name) for name in EXPORT_COLUMNS] for log in query.yield_per(1000))
+        # Late rows below the watermark are still live, so interleave the two sorted streams
+        for values in heapq.merge(archived, current, key=_export_order):
+            yield _csv_line(values)
+
+    filename = f"vehicle_logs_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.csv"
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+
+@vehicle_bp.route('/plate-search', methods=['GET'])
+def plate_search():
+    """Partial (`mode=contains`) or misread-tolerant (`mode=fuzzy`) plate search."""
+    query = clean_plate(request.args.get('q', ''))
+    mode = request.args.get('mode', 'contains')
+    if not query:
+        return jsonify({'error': 'Query parameter q is required'}), 400
+    if mode not in plate_search_service.MODES:
+        return jsonify({'error': 'Invalid mode. Use: contains, fuzzy'}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+
+    try:
+        matches = plate_search_service.search(
+            read_session(), query,
+            mode=mode,
+            limit=limit,
+            per_plate=current_app.config['PLATE_SEARCH_EVENTS'],
+            min_similarity=current_app.config['PLATE_SEARCH_MIN_SIMILARITY'],
+            archive_dir=current_app.config['ARCHIVE_DIR']
+        )
+        return jsonify({
+            'status': 'success',
+            'query': query,
+            'mode': mode,
+            'matches': matches
+        }), 200
+    except Exception as e:
+        logger.exception("Plate search failed")
+        return jsonify({
+            'status': 'error',
+            'message': f'Plate search failed: {str(e)}'
+        }), 500
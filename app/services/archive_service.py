@@ -0,0 +1,275 @@
+import glob
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete, or_
+from ..models.models1 import VehicleLog
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Columns copied from vehicle_log into the archive, in file order
+ARCHIVE_COLUMNS = (
+    'id', 'asset_id', 'asset_name', 'driver_name', 'timestamp', 'image_path',
+    'license_plate', 'direction', 'is_authorized', 'vehicle_id'
+)
+# Rows older than the watermark are read from the archive; newer ones from vehicle_log
+WATERMARK_FILE = '_watermark.json'
+COUNT_CACHE_SIZE = 256
+DELETE_BATCH_SIZE = 1000
+
+_count_cache = {}
+_count_lock = threading.Lock()
+
+
+def _pyarrow():
+    # pyarrow is only needed by the archive job and archive reads
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    return pa, ds, pq
+
+
+def _schema(pa):
+    return pa.schema([
+        ('id', pa.int64()),
+        ('asset_id', pa.string()),
+        ('asset_name', pa.string()),
+        ('driver_name', pa.string()),
+        ('timestamp', pa.timestamp('us')),
+        ('image_path', pa.string()),
+        ('license_plate', pa.string()),
+        ('direction', pa.string()),
+        ('is_authorized', pa.bool_()),
+        ('vehicle_id', pa.int64()),
+    ])
+
+
+def _state(archive_dir):
+    try:
+        with open(os.path.join(archive_dir, WATERMARK_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _cutoff(state):
+    archived_before = state.get('archived_before')
+    return datetime.fromisoformat(archived_before) if archived_before else None
+
+
+def version(archive_dir):
+    """A value that changes with every archive run, or None if nothing has been archived yet."""
+    return _state(archive_dir).get('runs')
+
+
+def watermark(archive_dir):
+    """Return the archive cutoff, or None if nothing has been archived yet."""
+    return _cutoff(_state(archive_dir))
+
+
+def live_condition(archive_dir):
+    """Filter for vehicle_log rows the archive does not serve, or None before the first run.
+
+    That is rows from the watermark on, plus rows inserted below it after a
+    run (late uploads, backfills), which have ids above every archived one.
+    Rows written by a run but not yet deleted, here or on a lagging
+    replica, are excluded either way.
+    """
+    state = _state(archive_dir)
+    cutoff = _cutoff(state)
+    if cutoff is None:
+        return None
+    if 'last_id' not in state:
+        # Written before ids were tracked
+        return VehicleLog.timestamp >= cutoff
+    return or_(VehicleLog.timestamp >= cutoff, VehicleLog.id > state['last_id'])
+
+
+def _save_state(archive_dir, state):
+    path = os.path.join(archive_dir, WATERMARK_FILE)
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _run_files(archive_dir, run_id):
+    return glob.glob(os.path.join(archive_dir, 'day=*', f"part-{run_id}.parquet"))
+
+
+def _write_day(archive_dir, day, rows, run_id, pa, pq):
+    """Write one day's rows as a zstd Parquet part, atomically."""
+    partition = os.path.join(archive_dir, f"day={day.isoformat()}")
+    os.makedirs(partition, exist_ok=True)
+    table = pa.Table.from_pylist(rows, schema=_schema(pa))
+    path = os.path.join(partition, f"part-{run_id}.parquet")
+    tmp = os.path.join(partition, f".part-{run_id}.parquet.tmp")
+    pq.write_table(table, tmp, compression='zstd')
+    os.replace(tmp, path)
+
+
+def _finish_run(session, archive_dir, state, pq):
+    """Delete exactly the rows a saved run wrote, by id, then clear its pending mark."""
+    run_id = state.pop('pending_run')
+    removed = 0
+    for path in _run_files(archive_dir, run_id):
+        ids = pq.read_table(path, columns=['id']).column('id').to_pylist()
+        for i in range(0, len(ids), DELETE_BATCH_SIZE):
+            removed += session.execute(
+                delete(VehicleLog).where(VehicleLog.id.in_(ids[i:i + DELETE_BATCH_SIZE]))
+            ).rowcount
+        session.commit()
+    _save_state(archive_dir, state)
+    return removed
+
+
+def archive_logs(session, archive_dir, older_than_days, now=None):
+    """Move VehicleLog rows older than `older_than_days` into the Parquet archive.
+
+    Every row before the cutoff is written, including rows that arrived late
+    for days an earlier run already archived, as one part per day named
+    after the run. The state file then moves the watermark forward and marks
+    the run pending, and only the ids in that run's parts are deleted. A run
+    that died before saving the state is redone under the same name; one
+    that died after it finishes its delete at the start of the next run.
+    """
+    if older_than_days < 1:
+        raise ValueError("older_than_days must be at least 1")
+    pa, _, pq = _pyarrow()
+    os.makedirs(archive_dir, exist_ok=True)
+    state = _state(archive_dir)
+    if state.get('pending_run'):
+        leftover = _finish_run(session, archive_dir, state, pq)
+        logger.info("Removed rows already archived", extra={'removed': leftover})
+
+    now = now or datetime.utcnow()
+    cutoff = (now - timedelta(days=older_than_days)).replace(hour=0, minute=0, second=0, microsecond=0)
+    previous = _cutoff(state)
+    if previous is not None and cutoff < previous:
+        # The watermark never moves back
+        cutoff = previous
+
+    run_id = f"{state.get('runs', 0) + 1:06d}"
+    for path in _run_files(archive_dir, run_id):
+        # Parts of an attempt that died before saving the state
+        os.remove(path)
+
+    rows = session.execute(
+        select(*(getattr(VehicleLog, name) for name in ARCHIVE_COLUMNS))
+        .where(VehicleLog.timestamp < cutoff)
+        .order_by(VehicleLog.timestamp, VehicleLog.id)
+        .execution_options(yield_per=1000)
+    )
+    archived = 0
+    newest = state.get('last_id', 0)
+    day, batch = None, []
+    for row in rows:
+        newest = max(newest, row.id)
+        if batch and row.timestamp.date() != day:
+            _write_day(archive_dir, day, batch, run_id, pa, pq)
+            archived += len(batch)
+            batch = []
+        day = row.timestamp.date()
+        batch.append(row._asdict())
+    if batch:
+        _write_day(archive_dir, day, batch, run_id, pa, pq)
+        archived += len(batch)
+    if not archived:
+        return 0
+
+    state.update(archived_before=cutoff.isoformat(), runs=int(run_id), pending_run=run_id, last_id=newest)
+    _save_state(archive_dir, state)
+    with _count_lock:
+        _count_cache.clear()
+    _finish_run(session, archive_dir, state, pq)
+    logger.info("Archived gate events", extra={'archived': archived, 'cutoff': cutoff.isoformat()})
+    return archived
+
+
+def _dataset(archive_dir):
+    pa, ds, _ = _pyarrow()
+    return ds.dataset(
+        archive_dir,
+        format='parquet',
+        schema=_schema(pa).append(pa.field('day', pa.string())),
+        partitioning=ds.partitioning(pa.schema([('day', pa.string())]), flavor='hive')
+    )
+
+
+def _filter(start, end, cutoff, ds):
+    """Partition and row filter for archived rows with start <= timestamp < end."""
+    end = min(end, cutoff) if end else cutoff
+    expression = (ds.field('timestamp') < end) & (ds.field('day') <= end.date().isoformat())
+    if start:
+        expression &= (ds.field('timestamp') >= start) & (ds.field('day') >= start.date().isoformat())
+    return expression
+
+
+def grouped_counts(archive_dir, columns, start=None, end=None):
+    """Archived row counts per distinct value of `columns`, with start <= timestamp < end.
+
+    `columns` may include 'day', the YYYY-MM-DD partition key. Keys of the
+    result are tuples in column order. Only day partitions inside the range
+    are opened, and results are cached until the next archive run since
+    archived files never change. Pair with `live_condition` for the rows
+    still in vehicle_log.
+    """
+    state = _state(archive_dir)
+    cutoff = _cutoff(state)
+    if cutoff is None or (start and start >= cutoff):
+        return {}
+
+    columns = tuple(columns)
+    key = (archive_dir, state.get('runs'), cutoff, columns, start, end)
+    with _count_lock:
+        if key in _count_cache:
+            return dict(_count_cache[key])
+
+    _, ds, _ = _pyarrow()
+    table = _dataset(archive_dir).to_table(columns=[*columns, 'id'], filter=_filter(start, end, cutoff, ds))
+    counts = {
+        tuple(row[name] for name in columns): row['id_count']
+        for row in table.group_by(list(columns)).aggregate([('id', 'count')]).to_pylist()
+    }
+
+    with _count_lock:
+        if len(_count_cache) >= COUNT_CACHE_SIZE:
+            _count_cache.clear()
+        _count_cache[key] = counts
+    return dict(counts)
+
+
+def _days(archive_dir, start, end):
+    """Day partitions on disk that can hold rows with start <= timestamp < end, oldest first."""
+    days = sorted(name[len('day='):] for name in os.listdir(archive_dir) if name.startswith('day='))
+    first = start.date().isoformat() if start else ''
+    return [day for day in days if first <= day <= end.date().isoformat()]
+
+
+def iter_rows(archive_dir, start=None, end=None, batch_size=10000):
+    """Yield archived rows as dicts in timestamp order, optionally within [start, end).
+
+    Partitions are read and sorted one day at a time, so memory follows the
+    busiest day rather than the length of the range.
+    """
+    cutoff = watermark(archive_dir)
+    if cutoff is None or (start and start >= cutoff):
+        return
+    pa, ds, _ = _pyarrow()
+    end = min(end, cutoff) if end else cutoff
+    expression = ds.field('timestamp') < end
+    if start:
+        expression &= ds.field('timestamp') >= start
+    for day in _days(archive_dir, start, end):
+        table = ds.dataset(
+            os.path.join(archive_dir, f"day={day}"), format='parquet', schema=_schema(pa)
+        ).to_table(
+            columns=list(ARCHIVE_COLUMNS), filter=expression
+        ).sort_by([('timestamp', 'ascending'), ('id', 'ascending')])
+        for batch in table.to_batches(max_chunksize=batch_size):
+            yield from batch.to_pylist()
@@ -1,19 +1,84 @@
+import asyncio
+from sqlalchemy import select
 from ..models.user import User
 from ..extensions import db
-from ..utils.hashing import hash_password, check_password
+from ..utils.hashing import (
+    hash_password, check_password, hash_password_future, check_password_future, needs_rehash, HashingBusyError
+)
+from ..utils.rate_limiter import get_limiter
 
-def register_user(username, email, password):
-    if User.query.filter((User.email == email) | (User.username == username)).first():
-        return None, "User already exists"
+USER_EXISTS = "User already exists"
+INVALID_CREDENTIALS = "Invalid credentials"
+
+def required_fields(data, *names):
+    """The named values of a JSON body, or None unless each is a non-empty string."""
+    values = tuple(data.get(name) for name in names)
+    return values if all(isinstance(value, str) and value for value in values) else None
+
+def rate_limit_wait(config, ip, email=None):
+    """Seconds to wait if the client IP (or the account) is over the auth rate limit, else None."""
+    limiter = get_limiter('auth', config.get('AUTH_RATE_PER_MINUTE', 10), config.get('AUTH_RATE_BURST', 5))
+    keys = [f"ip:{ip}"]
+    if email:
+        keys.append(f"email:{email.strip().lower()}")
+    return None if limiter.allow(*keys) else limiter.retry_after()
+
+def _existing_user(session, username, email):
+    return session.execute(
+        select(User.id).where((User.email == email) | (User.username == username)).limit(1)
+    ).first() is not None
 
-    hashed_pw = hash_password(password)
+def _add_user(session, username, email, hashed_pw):
     user = User(username=username, email=email, password=hashed_pw)
-    db.session.add(user)
-    db.session.commit()
+    session.add(user)
+    session.commit()
+    return user
+
+def _find_user(session, email):
+    return session.execute(select(User).filter_by(email=email).limit(1)).scalar_one_or_none()
+
+def _save_password(session, user, hashed_pw):
+    user.password = hashed_pw
+    session.commit()
+
+def register_user(username, email, password):
+    if _existing_user(db.session, username, email):
+        return None, USER_EXISTS
+
+    user = _add_user(db.session, username, email, hash_password(password))
     return user, None
 
 def login_user(email, password):
-    user = User.query.filter_by(email=email).first()
+    user = _find_user(db.session, email)
     if user and check_password(user.password, password):
+        # Upgrade hashes made with an older, cheaper cost factor
+        if needs_rehash(user.password):
+            try:
+                _save_password(db.session, user, hash_password(password))
+            except HashingBusyError:
+                pass
+        return user, None
+    return None, INVALID_CREDENTIALS
+
+async def register_user_async(session, username, email, password):
+    """`register_user` for an AsyncSession; bcrypt runs in the hashing pool, not on the event loop."""
+    if await session.run_sync(_existing_user, username, email):
+        return None, USER_EXISTS
+
+    hashed_pw = await asyncio.wrap_future(hash_password_future(password))
+    user = await session.run_sync(_add_user, username, email, hashed_pw)
+    return user, None
+
+async def login_user_async(session, email, password):
+    """`login_user` for an AsyncSession; bcrypt runs in the hashing pool, not on the event loop."""
+    user = await session.run_sync(_find_user, email)
+    if user and await asyncio.wrap_future(check_password_future(user.password, password)):
+        # Upgrade hashes made with an older, cheaper cost factor
+        if needs_rehash(user.password):
+            try:
+                hashed_pw = await asyncio.wrap_future(hash_password_future(password))
+                await session.run_sync(_save_password, user, hashed_pw)
+            except HashingBusyError:
+                pass
         return user, None
-    return None, "Invalid credentials"
+    return None, INVALID_CREDENTIALS
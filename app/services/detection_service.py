@@ -0,0 +1,162 @@
+from flask import current_app
+from .inference_service import detect_vehicles, detect_plates, read_plates
+from ..utils.plate_format import best_plate
+
+CLASS_MAP = {
+    0: "Person", 1: "Bicycle", 2: "Car", 3: "Motorcycle",
+    5: "Bus", 7: "Truck"
+}
+VEHICLE_CLASS_IDS = (1, 2, 3, 5, 7)
+
+# Share of a plate box that must fall inside a vehicle box to pair them
+PLATE_IN_VEHICLE_RATIO = 0.6
+# Padding added around vehicle boxes before searching them for plates (cascade mode)
+ROI_MARGIN = 0.05
+# Plates found twice in overlapping vehicle crops are merged above this IoU
+DUPLICATE_PLATE_IOU = 0.5
+# Keys a detection carries for its plate (None when it has no plate)
+PLATE_FIELDS = ('plate_box', 'plate_confidence', 'plate_text', 'ocr_confidence')
+
+
+def _area(box):
+    return max(box[2] - box[0], 0) * max(box[3] - box[1], 0)
+
+
+def _containment(plate_box, vehicle_box):
+    """Fraction of the plate box that lies inside the vehicle box."""
+    ix1, iy1 = max(plate_box[0], vehicle_box[0]), max(plate_box[1], vehicle_box[1])
+    ix2, iy2 = min(plate_box[2], vehicle_box[2]), min(plate_box[3], vehicle_box[3])
+    plate_area = _area(plate_box)
+    if plate_area == 0:
+        return 0.0
+    return _area((ix1, iy1, ix2, iy2)) / plate_area
+
+
+def pair_plates(vehicles, plates):
+    """Match each plate to the tightest unclaimed vehicle box that contains it.
+
+    Returns a dict of plate index -> vehicle index. Plates are assigned in
+    order of confidence, so overlapping vehicles keep their strongest plate.
+    """
+    pairs = {}
+    claimed = set()
+    for p in sorted(range(len(plates)), key=lambda i: -plates[i][4]):
+        candidates = [
+            v for v in range(len(vehicles))
+            if v not in claimed and _containment(plates[p], vehicles[v]) >= PLATE_IN_VEHICLE_RATIO
+        ]
+        if candidates:
+            best = min(candidates, key=lambda v: _area(vehicles[v]))
+            pairs[p] = best
+            claimed.add(best)
+    return pairs
+
+
+def _iou(a, b):
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = _area((ix1, iy1, ix2, iy2))
+    union = _area(a) + _area(b) - inter
+    return inter / union if union else 0.0
+
+
+def _dedupe(boxes):
+    """Keep the most confident of any boxes overlapping above DUPLICATE_PLATE_IOU."""
+    kept = []
+    for row in sorted(boxes, key=lambda r: -r[4]):
+        if all(_iou(row, other) <= DUPLICATE_PLATE_IOU for other in kept):
+            kept.append(row)
+    return kept
+
+
+def _expand(box, frame_shape):
+    height, width = frame_shape[:2]
+    dx = (box[2] - box[0]) * ROI_MARGIN
+    dy = (box[3] - box[1]) * ROI_MARGIN
+    return [max(box[0] - dx, 0), max(box[1] - dy, 0), min(box[2] + dx, width), min(box[3] + dy, height)]
+
+
+def _box(row):
+    return [round(float(v), 1) for v in row[:4]]
+
+
+def detect_frame(frame, with_vehicles=True):
+    """Run the full pipeline on a staged frame and return one dict per object.
+
+    Every vehicle detection is returned, each with its paired plate (if
+    any); plates that sit inside no vehicle box are returned on their own.
+    All plate crops are OCR'd in a single batched call. Vehicle entries come
+    first, ordered by confidence.
+
+    With DETECTION_MODE = 'cascade' the vehicle detector always runs first
+    (at VEHICLE_IMGSZ) and the plate detector only searches the vehicle
+    crops (at PLATE_IMGSZ); a frame without vehicles returns no detections.
+    Otherwise both detectors run on the full frame, and `with_vehicles`
+    can skip the vehicle detector when only plates are needed.
+    """
+    config = current_app.config
+    vehicles = []
+    if config.get('DETECTION_MODE') == 'cascade':
+        # Vehicles first at reduced resolution; plates only inside vehicle crops
+        vehicles = [
+            row for row in detect_vehicles(frame, imgsz=config.get('VEHICLE_IMGSZ'))
+            if int(row[5]) in VEHICLE_CLASS_IDS
+        ]
+        if not vehicles:
+            return []
+        regions = [_expand(row, frame.shape) for row in vehicles]
+        plates = _dedupe(detect_plates(frame, regions=regions, imgsz=config.get('PLATE_IMGSZ')))
+    else:
+        if with_vehicles:
+            vehicles = [row for row in detect_vehicles(frame) if int(row[5]) in VEHICLE_CLASS_IDS]
+        plates = list(detect_plates(frame))
+
+    texts = []
+    if plates:
+        texts = read_plates(
+            frame, plates,
+            mode=config.get('OCR_MODE', 'plate'),
+            height=config.get('PLATE_OCR_HEIGHT', 64)
+        )
+    pairs = pair_plates(vehicles, plates)
+    plate_for_vehicle = {v: p for p, v in pairs.items()}
+
+    detections = []
+    for v, row in enumerate(vehicles):
+        class_id = int(row[5])
+        detection = {
+            'class_id': class_id,
+            'asset_name': CLASS_MAP.get(class_id, f"Unknown-{class_id}"),
+            'confidence': float(row[4]),
+            'vehicle_box': _box(row),
+            'plate_box': None,
+            'plate_confidence': None,
+            'plate_text': None,
+            'ocr_confidence': None
+        }
+        if v in plate_for_vehicle:
+            detection.update(_plate_fields(plates, texts, plate_for_vehicle[v], config))
+        detections.append(detection)
+
+    for p in range(len(plates)):
+        if p not in pairs:
+            detection = {
+                'class_id': None,
+                'asset_name': None,
+                'confidence': None,
+                'vehicle_box': None
+            }
+            detection.update(_plate_fields(plates, texts, p, config))
+            detections.append(detection)
+
+    return detections
+
+
+def _plate_fields(plates, texts, index, config):
+    text, ocr_confidence = texts[index]
+    return {
+        'plate_box': _box(plates[index]),
+        'plate_confidence': float(plates[index][4]),
+        'plate_text': best_plate(text, config.get('PLATE_FORMATS')) or None,
+        'ocr_confidence': ocr_confidence
+    }
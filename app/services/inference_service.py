@@ -0,0 +1,364 @@
+import multiprocessing as mp
+import string
+import threading
+from functools import partial
+import click
+import numpy as np
+from PIL import Image, ImageOps
+from ..utils.inference_pool import InferencePool
+from ..utils import model_registry
+from ..utils.logger import get_logger
+from . import stub_inference
+
+PLATE_ALPHABET = string.ascii_uppercase + string.digits
+# Crops narrower than this width/height ratio are read as two-line plates
+TWO_LINE_MAX_RATIO = 2.0
+
+logger = get_logger(__name__)
+
+_settings = {
+    'workers': 0, 'threads': 0, 'timeout': 60,
+    'model_dir': 'models', 'manifest': None, 'ocr_detector': False,
+    'backend': 'models', 'stub_delay_ms': 0
+}
+_models = {}
+_models_lock = threading.Lock()
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def init_app(app):
+    _settings['workers'] = app.config.get('INFERENCE_WORKERS', 0)
+    _settings['threads'] = app.config.get('INFERENCE_THREADS', 0)
+    _settings['timeout'] = app.config.get('INFERENCE_TIMEOUT', 60)
+    _settings['model_dir'] = app.config.get('MODEL_DIR', 'models')
+    _settings['manifest'] = app.config.get('MODEL_MANIFEST') or None
+    # EasyOCR's text detector is only needed outside the plate OCR fast path
+    _settings['ocr_detector'] = app.config.get('OCR_MODE', 'plate') != 'plate'
+    _settings['backend'] = app.config.get('INFERENCE_BACKEND', 'models')
+    _settings['stub_delay_ms'] = app.config.get('INFERENCE_STUB_DELAY_MS', 0)
+    if _settings['backend'] == 'stub':
+        stub_inference.configure(_settings['stub_delay_ms'])
+
+    # Inference worker processes re-import the app and CLI commands such as
+    # `flask db` build it too; only a serving parent process warms up
+    command = click.get_current_context(silent=True)
+    serving = command is None or command.info_name == 'run'
+    if app.config.get('MODEL_WARMUP') and serving and mp.parent_process() is None:
+        threading.Thread(target=warm_up, name='model-warmup', daemon=True).start()
+
+
+def load_models(threads=0, model_dir=None, manifest=None, ocr_detector=None):
+    """Load the detectors and OCR reader once per process.
+
+    torch, ultralytics and easyocr are imported here rather than at module
+    import so that migrations, auth-only workers and app startup never pay
+    for them. Model files come from the local manifest; nothing is downloaded.
+    """
+    with _models_lock:
+        if not _models:
+            import torch
+            import easyocr
+            from ultralytics import YOLO
+
+            model_dir = model_dir or _settings['model_dir']
+            manifest = manifest or _settings['manifest']
+            if ocr_detector is None:
+                ocr_detector = _settings['ocr_detector']
+            if threads:
+                torch.set_num_threads(threads)
+            _models['vehicle'] = YOLO(model_registry.resolve('vehicle', model_dir, manifest))
+            _models['plate'] = YOLO(model_registry.resolve('plate', model_dir, manifest))
+            _models['reader'] = easyocr.Reader(
+                ['en'],
+                gpu=False,
+                model_storage_directory=model_registry.easyocr_dir(model_dir, manifest, detector=ocr_detector),
+                download_enabled=False,
+                detector=ocr_detector
+            )
+    return _models
+
+
+def load_frame(image_path):
+    """Decode an image file to an RGB uint8 array."""
+    with Image.open(image_path) as img:
+        return np.asarray(ImageOps.exif_transpose(img).convert('RGB'))
+
+
+def _to_bgr(frame):
+    # Ultralytics treats ndarray input as OpenCV-style BGR
+    return np.ascontiguousarray(frame[:, :, ::-1])
+
+
+def _predict_options(imgsz):
+    options = {'verbose': False}
+    if imgsz:
+        options['imgsz'] = imgsz
+    return options
+
+
+def _detect_vehicles(frame, imgsz=None):
+    results = load_models()['vehicle'](_to_bgr(frame), **_predict_options(imgsz))
+    return results[0].boxes.data.cpu().numpy()
+
+
+def _detect_plates(frame, regions=None, imgsz=None):
+    if regions is None:
+        results = load_models()['plate'](_to_bgr(frame), **_predict_options(imgsz))
+        return results[0].boxes.data.cpu().numpy()
+
+    # Run the plate detector on all region crops as one batch, then shift
+    # the boxes back into frame coordinates
+    origins, crops = [], []
+    for region in regions:
+        crop = _crop(frame, region)
+        if crop.size:
+            origins.append((max(int(region[0]), 0), max(int(region[1]), 0)))
+            crops.append(_to_bgr(crop))
+    if not crops:
+        return np.zeros((0, 6), dtype=np.float32)
+
+    detections = []
+    for (ox, oy), result in zip(origins, load_models()['plate'](crops, **_predict_options(imgsz))):
+        boxes = result.boxes.data.cpu().numpy()
+        boxes[:, [0, 2]] += ox
+        boxes[:, [1, 3]] += oy
+        detections.append(boxes)
+    return np.concatenate(detections)
+
+
+def _crop(frame, box):
+    x1, y1, x2, y2 = [int(v) for v in box[:4]]
+    return np.ascontiguousarray(frame[max(y1, 0):y2, max(x1, 0):x2])
+
+
+def _read_plates(frame, boxes, mode='generic', height=64):
+    """OCR every plate crop in one batched EasyOCR call.
+
+    In 'generic' mode crops are resized to their median size so they can be
+    stacked into a single readtext batch; fragments of multi-line plates are
+    joined top to bottom. 'plate' mode skips text detection entirely, see
+    `_recognize_plates`.
+    """
+    crops = [_crop(frame, box) for box in boxes]
+    valid = [i for i, crop in enumerate(crops) if crop.size > 0]
+    texts = [('', 0.0)] * len(crops)
+    if not valid:
+        return texts
+
+    if mode == 'plate':
+        for i, result in zip(valid, _recognize_plates([crops[i] for i in valid], height)):
+            texts[i] = result
+        return texts
+
+    n_height = int(np.median([crops[i].shape[0] for i in valid]))
+    n_width = int(np.median([crops[i].shape[1] for i in valid]))
+    batched = load_models()['reader'].readtext_batched(
+        [crops[i] for i in valid], n_width=max(n_width, 1), n_height=max(n_height, 1)
+    )
+    for i, fragments in zip(valid, batched):
+        if not fragments:
+            continue
+        texts[i] = _join_fragments(fragments)
+    return texts
+
+
+def _to_plate_line(crop, height):
+    gray = Image.fromarray(crop).convert('L')
+    width = max(1, round(gray.width * height / max(gray.height, 1)))
+    return np.asarray(gray.resize((width, height), Image.BILINEAR))
+
+
+def _recognize_plates(crops, height):
+    """Recognise plate crops directly, without EasyOCR's text detector.
+
+    Each crop is converted to grayscale and scaled to a fixed line height;
+    near-square crops are split into two lines. All lines are stacked into
+    one canvas and passed to `Reader.recognize` with one box per line and
+    the alphabet restricted to A-Z0-9.
+    """
+    lines = []
+    for index, crop in enumerate(crops):
+        if crop.shape[1] / max(crop.shape[0], 1) < TWO_LINE_MAX_RATIO:
+            middle = crop.shape[0] // 2
+            lines.append((index, _to_plate_line(crop[:middle], height)))
+            lines.append((index, _to_plate_line(crop[middle:], height)))
+        else:
+            lines.append((index, _to_plate_line(crop, height)))
+
+    canvas = np.full((height * len(lines), max(line.shape[1] for _, line in lines)), 255, dtype=np.uint8)
+    horizontal_list = []
+    row_owner = {}
+    for row, (index, line) in enumerate(lines):
+        top = row * height
+        canvas[top:top + height, :line.shape[1]] = line
+        horizontal_list.append([0, line.shape[1], top, top + height])
+        row_owner[top] = index
+
+    recognized = load_models()['reader'].recognize(
+        canvas,
+        horizontal_list=horizontal_list,
+        free_list=[],
+        allowlist=PLATE_ALPHABET,
+        batch_size=len(horizontal_list),
+        detail=1
+    )
+
+    parts = [[] for _ in crops]
+    for box, text, confidence in recognized:
+        top = int(box[0][1])
+        parts[row_owner[top]].append((top, text, float(confidence)))
+    results = []
+    for fragments in parts:
+        if not fragments:
+            results.append(('', 0.0))
+            continue
+        fragments.sort()
+        results.append((''.join(f[1] for f in fragments), min(f[2] for f in fragments)))
+    return results
+
+
+def _join_fragments(fragments):
+    # Group fragments into text lines by vertical centre, then read left to right
+    heights = [max(f[0][2][1] - f[0][0][1], 1) for f in fragments]
+    line_height = float(np.median(heights))
+    ordered = sorted(
+        fragments,
+        key=lambda f: (int(((f[0][0][1] + f[0][2][1]) / 2) // line_height), f[0][0][0])
+    )
+    text = ''.join(f[1] for f in ordered)
+    confidence = min(float(f[2]) for f in ordered)
+    return text, confidence
+
+
+def _warm_up(frame):
+    """Run every model once so lazy initialisation happens before real traffic."""
+    _detect_vehicles(frame)
+    _detect_plates(frame)
+    _recognize_plates([frame[:64, :256]], 64)
+    return True
+
+
+OPS = {
+    'detect_vehicles': _detect_vehicles,
+    'detect_plates': _detect_plates,
+    'read_plates': _read_plates,
+    'warm_up': _warm_up,
+}
+
+
+def load_worker_ops(threads, model_dir=None, manifest=None, ocr_detector=False, backend='models', stub_delay_ms=0):
+    """Initializer hook for inference worker processes."""
+    if backend == 'stub':
+        stub_inference.configure(stub_delay_ms)
+        return stub_inference.OPS
+    load_models(threads, model_dir, manifest, ocr_detector)
+    return OPS
+
+
+def _get_pool():
+    global _pool
+    if _settings['workers'] <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            loader = partial(
+                load_worker_ops,
+                model_dir=_settings['model_dir'],
+                manifest=_settings['manifest'],
+                ocr_detector=_settings['ocr_detector'],
+                backend=_settings['backend'],
+                stub_delay_ms=_settings['stub_delay_ms']
+            )
+            _pool = InferencePool(
+                _settings['workers'],
+                loader,
+                threads=_settings['threads'],
+                timeout=_settings['timeout']
+            )
+    return _pool
+
+
+class LocalFrame:
+    """Runs ops on the calling thread when no worker pool is configured."""
+
+    def __init__(self, frame):
+        self.array = frame
+        self.shape = frame.shape
+
+    def run(self, op, **kwargs):
+        if _settings['backend'] == 'stub':
+            return stub_inference.OPS[op](self.array, **kwargs)
+        load_models(_settings['threads'])
+        return OPS[op](self.array, **kwargs)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def open_frame(image_path):
+    """Decode an image and stage it for inference.
+
+    Use as a context manager; with a worker pool the frame lives in shared
+    memory until the block exits.
+    """
+    frame = load_frame(image_path)
+    pool = _get_pool()
+    if pool is None:
+        return LocalFrame(frame)
+    return pool.stage(frame)
+
+
+def detect_vehicles(frame, imgsz=None):
+    """Return vehicle-model detections as an (N, 6) array: x1, y1, x2, y2, conf, cls."""
+    return frame.run('detect_vehicles', imgsz=imgsz)
+
+
+def detect_plates(frame, regions=None, imgsz=None):
+    """Return plate-model detections as an (N, 6) array: x1, y1, x2, y2, conf, cls.
+
+    With `regions`, only those (x1, y1, x2, y2) crops of the frame are
+    searched; boxes are still returned in frame coordinates.
+    """
+    if regions is not None:
+        regions = [[float(v) for v in region[:4]] for region in regions]
+    return frame.run('detect_plates', regions=regions, imgsz=imgsz)
+
+
+def read_plates(frame, boxes, mode='generic', height=64):
+    """OCR several plate regions at once; returns [(text, confidence)] in box order."""
+    return frame.run(
+        'read_plates',
+        boxes=[[float(v) for v in box[:4]] for box in boxes],
+        mode=mode,
+        height=height
+    )
+
+
+def warm_up():
+    """Load the models and run one dummy inference (in every worker, if pooled)."""
+    frame = np.zeros((640, 640, 3), dtype=np.uint8)
+    try:
+        pool = _get_pool()
+        if pool is None:
+            LocalFrame(frame).run('warm_up')
+        else:
+            with pool.stage(frame) as staged:
+                # Concurrent submissions make the executor start every worker
+                threads = [
+                    threading.Thread(target=staged.run, args=('warm_up',))
+                    for _ in range(_settings['workers'])
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+        logger.info("Model warm-up complete", extra={'workers': _settings['workers']})
+    except Exception:
+        logger.exception("Model warm-up failed")
@@ -0,0 +1,84 @@
+from datetime import datetime
+from sqlalchemy import select
+from ..extensions import db
+from ..models.models1 import VehicleLog
+from ..models.vehicle import Vehicle
+from ..utils.event_bus import live_events
+from . import presence_service
+
+
+def serialize_log(log):
+    return {
+        'id': log.id,
+        'license_plate': log.license_plate,
+        'vehicle_type': log.asset_name,
+        'direction': log.direction,
+        'is_authorized': log.is_authorized,
+        'timestamp': log.timestamp.isoformat(),
+        'driver_name': log.driver_name,
+        'image_path': log.image_path
+    }
+
+
+def logs_from_upload(session, cached, direction, driver_name):
+    """Build one VehicleLog per vehicle of a cached /upload-image result.
+
+    Returns the unsaved rows and a per-plate authorization summary for the response.
+    """
+    entries = cached.get('vehicles') or [
+        {'asset_id': cached['asset_id'], 'asset_name': cached['asset_name']}
+    ]
+    # Find all detected vehicles in DB with one query
+    plates = [entry['asset_id'] for entry in entries]
+    known = {
+        vehicle.license_plate: vehicle
+        for vehicle in session.execute(select(Vehicle).where(Vehicle.license_plate.in_(plates))).scalars()
+    }
+
+    timestamp = datetime.utcnow()
+    logs = []
+    logged = []
+    for entry in entries:
+        license_plate = entry['asset_id']
+        vehicle = known.get(license_plate)
+        is_authorized = vehicle.authorized if vehicle else False
+
+        logs.append(VehicleLog(
+            asset_id=license_plate,
+            asset_name=entry['asset_name'],
+            driver_name=driver_name,
+            timestamp=timestamp,
+            image_path=cached['image_path'],
+            license_plate=license_plate,
+            direction=direction,
+            is_authorized=is_authorized,
+            vehicle_id=vehicle.id if vehicle else None
+        ))
+        logged.append({'license_plate': license_plate, 'is_authorized': is_authorized})
+    return logs, logged
+
+
+def commit_logs(logs):
+    """Persist new VehicleLog rows and their presence updates in one transaction,
+    then push them to live dashboard clients. Returns the serialized rows."""
+    db.session.add_all(logs)
+    # Flush for ids and serialize before commit expires the instances
+    db.session.flush()
+    presence_service.record_events(db.session, logs)
+    events = [serialize_log(log) for log in logs]
+    db.session.commit()
+    for event in events:
+        live_events.publish('vehicle_log', event)
+    return events
+
+
+async def commit_logs_async(session, logs):
+    """`commit_logs` for an AsyncSession; presence updates run via `run_sync`."""
+    session.add_all(logs)
+    await session.flush()
+    await session.run_sync(presence_service.record_events, logs)
+    events = [serialize_log(log) for log in logs]
+    await session.commit()
+    for event in events:
+        live_events.publish('vehicle_log', event)
+    return events
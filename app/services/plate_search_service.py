@@ -0,0 +1,138 @@
+import threading
+from sqlalchemy import select, func
+from ..models.models1 import VehicleLog
+from ..utils.plate_index import PlateIndex, plate_index
+from . import archive_service
+from .log_service import serialize_log
+
+MODES = ('contains', 'fuzzy')
+# Ids are handed out before commit, so rows below the index's last_id can still appear
+INDEX_RESCAN_IDS = 1000
+
+# Trigram index over archived plates, rebuilt after each archive run
+_archived = {'version': None, 'index': None}
+_archived_lock = threading.Lock()
+
+
+def uses_trigram_index(session):
+    return session.get_bind(mapper=VehicleLog).dialect.name == 'postgresql'
+
+
+def rank_postgres(session, query, mode, limit, min_similarity):
+    """Rank plates using the pg_trgm GIN index on vehicle_log.license_plate."""
+    score = func.similarity(VehicleLog.license_plate, query)
+    if mode == 'contains':
+        condition = VehicleLog.license_plate.ilike(f"%{query}%")
+    else:
+        # `%` compares against this setting; is_local scopes it to the current transaction
+        session.execute(select(func.set_config('pg_trgm.similarity_threshold', str(min_similarity), True)))
+        condition = VehicleLog.license_plate.op('%')(query)
+    rows = session.execute(
+        select(VehicleLog.license_plate, score.label('score'))
+        .where(condition)
+        .group_by(VehicleLog.license_plate)
+        .order_by(score.desc(), VehicleLog.license_plate)
+        .limit(limit)
+    ).all()
+    return [(float(row.score), row.license_plate) for row in rows]
+
+
+def index_backlog(session):
+    """(plate, newest id) pairs of rows the in-process index may not have seen yet."""
+    return session.execute(
+        select(VehicleLog.license_plate, func.max(VehicleLog.id))
+        .where(
+            VehicleLog.id > plate_index.last_id - INDEX_RESCAN_IDS,
+            VehicleLog.license_plate.isnot(None)
+        )
+        .group_by(VehicleLog.license_plate)
+    ).all()
+
+
+def rank_index(backlog, query, mode, limit, min_similarity):
+    """Catch the in-process trigram index up with `backlog`, then rank plates with it."""
+    if backlog:
+        plate_index.add([plate for plate, _ in backlog], max(last_id for _, last_id in backlog))
+    return plate_index.search(query, mode=mode, limit=limit, min_similarity=min_similarity)
+
+
+def _archived_index(archive_dir):
+    version = archive_service.version(archive_dir)
+    if version is None:
+        return None
+    with _archived_lock:
+        if _archived['version'] != version:
+            index = PlateIndex()
+            counts = archive_service.grouped_counts(archive_dir, ('license_plate',))
+            index.add([plate for (plate,) in counts if plate], 0)
+            _archived.update(version=version, index=index)
+        return _archived['index']
+
+
+def rank_archived(archive_dir, query, mode, limit, min_similarity):
+    """Rank plates that appear in the Parquet archive, scored like the live backends."""
+    index = _archived_index(archive_dir) if archive_dir else None
+    if index is None:
+        return []
+    return index.search(query, mode=mode, limit=limit, min_similarity=min_similarity)
+
+
+def merge_ranked(limit, *rankings):
+    """Combine (score, plate) rankings, keeping each plate once, best first."""
+    best = {}
+    for ranked in rankings:
+        for score, plate in ranked:
+            best[plate] = max(score, best.get(plate, score))
+    ranked = sorted(((score, plate) for plate, score in best.items()), key=lambda item: (-item[0], item[1]))
+    return ranked[:limit]
+
+
+def recent_events(session, plates, per_plate):
+    """The latest `per_plate` events of each plate, newest first, in one query."""
+    if not plates:
+        return {}
+    rank = func.row_number().over(
+        partition_by=VehicleLog.license_plate,
+        order_by=(VehicleLog.timestamp.desc(), VehicleLog.id.desc())
+    ).label('rank')
+    ranked = select(VehicleLog.id, rank).where(VehicleLog.license_plate.in_(plates)).subquery()
+    logs = session.execute(
+        select(VehicleLog)
+        .join(ranked, VehicleLog.id == ranked.c.id)
+        .where(ranked.c.rank <= per_plate)
+        .order_by(VehicleLog.timestamp.desc(), VehicleLog.id.desc())
+    ).scalars()
+
+    events = {plate: [] for plate in plates}
+    for log in logs:
+        events[log.license_plate].append(serialize_log(log))
+    return events
+
+
+def with_events(session, ranked, per_plate):
+    """Attach each ranked plate's recent events."""
+    events = recent_events(session, [plate for _, plate in ranked], per_plate)
+    return [
+        {
+            'license_plate': plate,
+            'score': round(score, 3),
+            'last_seen': events[plate][0]['timestamp'] if events[plate] else None,
+            'recent_events': events[plate]
+        }
+        for score, plate in ranked
+    ]
+
+
+def search(session, query, mode='contains', limit=20, per_plate=5, min_similarity=0.3, archive_dir=None):
+    """Plates matching `query`, ranked by trigram similarity, with their recent events.
+
+    Live plates are ranked with pg_trgm on Postgres and the in-app index
+    everywhere else; with `archive_dir`, archived plates are ranked too.
+    Plates whose events have all been archived are returned with no events.
+    """
+    if uses_trigram_index(session):
+        ranked = rank_postgres(session, query, mode, limit, min_similarity)
+    else:
+        ranked = rank_index(index_backlog(session), query, mode, limit, min_similarity)
+    ranked = merge_ranked(limit, ranked, rank_archived(archive_dir, query, mode, limit, min_similarity))
+    return with_events(session, ranked, per_plate)
@@ -0,0 +1,195 @@
+import heapq
+from datetime import datetime
+from types import SimpleNamespace
+from sqlalchemy import select, delete, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from . import archive_service
+from ..models.models1 import VehicleLog
+from ..models.presence import VehiclePresence
+from ..utils.plate_format import is_read_plate
+
+INSIDE = 'inside'
+OUTSIDE = 'outside'
+# Ids below the newest one replayed that may still have been uncommitted at the time
+REBUILD_RESCAN_IDS = 1000
+
+
+def _apply(presence, log):
+    """Fold one gate event into a plate's presence row."""
+    if presence.last_seen is not None and log.timestamp < presence.last_seen:
+        # Late, out-of-order event: newer state already recorded
+        return
+    if log.direction == 'inbound':
+        if presence.state != INSIDE:
+            presence.state = INSIDE
+            presence.entered_at = log.timestamp
+    elif log.direction == 'outbound':
+        if presence.state == INSIDE and presence.entered_at is not None:
+            dwell = int((log.timestamp - presence.entered_at).total_seconds())
+            presence.last_dwell_seconds = dwell
+            presence.total_dwell_seconds = (presence.total_dwell_seconds or 0) + dwell
+        presence.state = OUTSIDE
+        presence.exited_at = log.timestamp
+    presence.last_seen = log.timestamp
+    presence.asset_name = log.asset_name
+    presence.is_authorized = log.is_authorized
+    presence.vehicle_id = log.vehicle_id
+    presence.last_log_id = log.id
+
+
+def _new_presence(plate, last_seen=None):
+    return VehiclePresence(license_plate=plate, state=OUTSIDE, total_dwell_seconds=0, last_seen=last_seen)
+
+
+def _tracked(log):
+    # Placeholder asset ids are unique per image, so they could never be matched by an exit
+    return is_read_plate(log.license_plate) and log.direction in ('inbound', 'outbound')
+
+
+def _insert_missing(session, first_seen):
+    """Create presence rows for plates seen for the first time, tolerating concurrent inserts."""
+    values = [
+        {'license_plate': plate, 'state': OUTSIDE, 'total_dwell_seconds': 0, 'last_seen': seen}
+        for plate, seen in sorted(first_seen.items())
+    ]
+    dialect = session.get_bind(mapper=VehiclePresence).dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        session.execute(
+            insert(VehiclePresence).values(values).on_conflict_do_nothing(index_elements=['license_plate'])
+        )
+        return
+
+    existing = set(session.execute(
+        select(VehiclePresence.license_plate).where(VehiclePresence.license_plate.in_(first_seen))
+    ).scalars())
+    for value in values:
+        if value['license_plate'] in existing:
+            continue
+        try:
+            with session.begin_nested():
+                session.add(VehiclePresence(**value))
+        except IntegrityError:
+            # Another transaction created it first; it is locked and updated below
+            pass
+
+
+def record_events(session, logs):
+    """Update presence rows for newly flushed logs, in the caller's transaction.
+
+    Missing rows are inserted first (ignoring conflicts), so every plate's
+    row exists and can be locked. Two gate events for a new plate arriving
+    at once then serialise on that lock instead of one failing on the
+    primary key at commit.
+    """
+    events = [log for log in logs if _tracked(log)]
+    if not events:
+        return
+    first_seen = {}
+    for log in events:
+        seen = first_seen.get(log.license_plate)
+        first_seen[log.license_plate] = log.timestamp if seen is None else min(seen, log.timestamp)
+    _insert_missing(session, first_seen)
+
+    # Lock in plate order so concurrent multi-plate events can't deadlock
+    rows = {
+        presence.license_plate: presence
+        for presence in session.execute(
+            select(VehiclePresence)
+            .where(VehiclePresence.license_plate.in_(first_seen))
+            .order_by(VehiclePresence.license_plate)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        ).scalars()
+    }
+    for log in events:
+        _apply(rows[log.license_plate], log)
+
+
+def occupancy(session, overstay_after, now=None):
+    """Vehicles currently inside, plus the overstaying and unauthorized subsets.
+
+    Only reads `vehicle_presence` rows in the 'inside' state, so the cost
+    follows current occupancy rather than the size of the gate log.
+    """
+    now = now or datetime.utcnow()
+    inside = session.execute(
+        select(VehiclePresence)
+        .where(VehiclePresence.state == INSIDE)
+        .order_by(VehiclePresence.entered_at)
+    ).scalars().all()
+
+    vehicles = []
+    for presence in inside:
+        dwell = int((now - presence.entered_at).total_seconds()) if presence.entered_at else None
+        vehicles.append({
+            'license_plate': presence.license_plate,
+            'vehicle_type': presence.asset_name,
+            'is_authorized': presence.is_authorized,
+            'entered_at': presence.entered_at.isoformat() if presence.entered_at else None,
+            'dwell_seconds': dwell,
+            'overstay': dwell is not None and dwell > overstay_after.total_seconds()
+        })
+    return {
+        'inside_count': len(vehicles),
+        'vehicles': vehicles,
+        'overstays': [v for v in vehicles if v['overstay']],
+        'unauthorized': [v for v in vehicles if not v['is_authorized']]
+    }
+
+
+def _lock_presence(session):
+    """Block record_events until the rebuild commits.
+
+    Elsewhere the DELETE that follows takes the write lock (SQLite) or locks the rows.
+    """
+    if session.get_bind(mapper=VehiclePresence).dialect.name == 'postgresql':
+        session.execute(text(f"LOCK TABLE {VehiclePresence.__tablename__} IN EXCLUSIVE MODE"))
+
+
+def rebuild(session, archive_dir=None, batch_size=1000):
+    """Recompute every presence row by replaying the full gate history.
+
+    With `archive_dir`, archived events are merged in by timestamp. The replay runs unlocked, then
+    the table is locked and the most recent events are replayed again, so
+    events recorded meanwhile are not lost when the rows are swapped in.
+    Re-applying an event already folded in changes nothing.
+    """
+    rows = {}
+    archived = []
+    query = (
+        select(VehicleLog)
+        .where(VehicleLog.direction.in_(['inbound', 'outbound']), VehicleLog.license_plate.isnot(None))
+        .order_by(VehicleLog.timestamp, VehicleLog.id)
+        .execution_options(yield_per=batch_size)
+    )
+    if archive_dir:
+        live = archive_service.live_condition(archive_dir)
+        if live is not None:
+            archived = (SimpleNamespace(**row) for row in archive_service.iter_rows(archive_dir))
+            query = query.where(live)
+
+    def replay(logs):
+        newest = 0
+        for log in logs:
+            newest = max(newest, log.id)
+            if not _tracked(log):
+                continue
+            presence = rows.get(log.license_plate)
+            if presence is None:
+                presence = rows[log.license_plate] = _new_presence(log.license_plate)
+            _apply(presence, log)
+        return newest
+
+    # Late rows below the watermark are still live, so interleave the two sorted streams
+    newest = replay(heapq.merge(
+        archived, session.execute(query).scalars(), key=lambda log: (log.timestamp, log.id)
+    ))
+
+    _lock_presence(session)
+    session.execute(delete(VehiclePresence))
+    replay(session.execute(query.where(VehicleLog.id > newest - REBUILD_RESCAN_IDS)).scalars())
+    session.add_all(rows.values())
+    session.commit()
+    return len(rows)
@@ -0,0 +1,237 @@
+from datetime import date, datetime, timedelta
+from sqlalchemy import select, func
+from ..models.models1 import VehicleLog
+from ..models.vehicle import Vehicle
+from . import archive_service
+from .log_service import serialize_log
+
+DIRECTIONS = ('inbound', 'outbound')
+PERIODS = ('day', 'week', 'month')
+MOVEMENT_PERIODS = ('today', '7days', 'monthly', 'yearly')
+
+
+def authorized_vehicles(session):
+    vehicles = session.execute(select(Vehicle).where(Vehicle.authorized.is_(True))).scalars()
+    return [
+        {
+            'id': vehicle.id,
+            'license_plate': vehicle.license_plate,
+            'vehicle_type': vehicle.vehicle_type,
+            'color': vehicle.color,
+            'owner_name': vehicle.owner_name,
+            'authorized': vehicle.authorized,
+            'added_on': vehicle.added_on.isoformat() if vehicle.added_on else None
+        }
+        for vehicle in vehicles
+    ]
+
+
+def recent_movements(session, limit=20):
+    movements = session.execute(
+        select(VehicleLog)
+        .where(VehicleLog.direction.in_(DIRECTIONS))
+        .order_by(VehicleLog.timestamp.desc())
+        .limit(limit)
+    ).scalars()
+    return [serialize_log(log) for log in movements]
+
+
+def latest_logs(session, limit=50):
+    """The newest gate events in the /api/vehicle-logs shape."""
+    logs = session.execute(select(VehicleLog).order_by(VehicleLog.timestamp.desc()).limit(limit)).scalars()
+    return [
+        {
+            'license_plate': log.license_plate,
+            'direction': log.direction,
+            'timestamp': log.timestamp.isoformat(),
+            'is_authorized': log.is_authorized,
+            'image_path': log.image_path,
+            'driver_name': log.driver_name,
+            'asset_name': log.asset_name
+        }
+        for log in logs
+    ]
+
+
+class Archived:
+    """The archive side of a stats query: counts per grouping plus the matching live filter.
+
+    Built by the `archived_*` functions, which read only the Parquet archive,
+    and passed to the SQL side. ASGI handlers build it in a worker thread so
+    pyarrow scans never run on the event loop.
+    """
+
+    def __init__(self, archive_dir, groupings, period=None, labels=None):
+        self.live = archive_service.live_condition(archive_dir)
+        self.groupings = groupings
+        self.counts = [
+            archive_service.grouped_counts(archive_dir, columns, start, end)
+            for columns, start, end in groupings
+        ]
+        self.period = period
+        self.labels = labels
+
+
+def _live(query, live, start=None, end=None):
+    """Bound a vehicle_log query to start <= timestamp < end and to rows the archive does not serve."""
+    if start:
+        query = query.where(VehicleLog.timestamp >= start)
+    if end:
+        query = query.where(VehicleLog.timestamp < end)
+    if live is not None:
+        query = query.where(live)
+    return query
+
+
+def _grouped_counts(session, live, archived, column, start=None, end=None):
+    """Event counts per value of a VehicleLog column, archive and live table combined."""
+    counts = {value: count for (value,), count in archived.items()}
+    attr = getattr(VehicleLog, column)
+    rows = session.execute(_live(select(attr, func.count(VehicleLog.id)), live, start, end).group_by(attr))
+    for value, count in rows:
+        counts[value] = counts.get(value, 0) + count
+    return counts
+
+
+def _direction_counts(session, live, archived, start=None, end=None):
+    counts = _grouped_counts(session, live, archived, 'direction', start, end)
+    return {direction: counts.get(direction, 0) for direction in DIRECTIONS}
+
+
+def archived_direction_counts(archive_dir):
+    return Archived(archive_dir, [(('direction',), None, None)])
+
+
+def direction_counts(session, archived):
+    """All-time inbound and outbound totals."""
+    return _direction_counts(session, archived.live, archived.counts[0])
+
+
+def archived_dashboard(archive_dir):
+    return Archived(archive_dir, [(('is_authorized',), None, None), (('direction',), None, None)])
+
+
+def dashboard_stats(session, archived, now=None):
+    """Totals for the dashboard cards, over the full history."""
+    now = now or datetime.utcnow()
+    total_authorized = session.scalar(select(func.count(Vehicle.id)).where(Vehicle.authorized.is_(True)))
+    vehicle_types = session.execute(
+        select(Vehicle.vehicle_type, func.count(Vehicle.id))
+        .where(Vehicle.authorized.is_(True))
+        .group_by(Vehicle.vehicle_type)
+    ).all()
+    # Archived events are always at least a day old
+    recent_logs = session.scalar(
+        select(func.count(VehicleLog.id)).where(VehicleLog.timestamp >= now - timedelta(days=1))
+    )
+    authorized = _grouped_counts(session, archived.live, archived.counts[0], 'is_authorized')
+    directions = _direction_counts(session, archived.live, archived.counts[1])
+    return {
+        'total_authorized_vehicles': total_authorized,
+        'vehicle_types_distribution': dict(vehicle_types),
+        'recent_entries_24h': recent_logs,
+        'authorized_entries': authorized.get(True, 0),
+        'unauthorized_entries': authorized.get(False, 0),
+        'inbound_count': directions['inbound'],
+        'outbound_count': directions['outbound']
+    }
+
+
+def _period_key(day, period):
+    """Bucket an archive day like str() of the database's date()/date_trunc() value."""
+    if period == 'day':
+        return day
+    start = date.fromisoformat(day)
+    if period == 'week':
+        start -= timedelta(days=start.weekday())
+    else:
+        start = start.replace(day=1)
+    return f"{start.isoformat()} 00:00:00"
+
+
+def archived_period_counts(archive_dir, period):
+    return Archived(archive_dir, [(('day', 'direction'), None, None)], period=period)
+
+
+def period_counts(session, archived):
+    """Per-direction counts for each day, week or month, oldest first."""
+    period = archived.period
+    if period == 'day':
+        group_by = func.date(VehicleLog.timestamp)
+    else:
+        group_by = func.date_trunc(period, VehicleLog.timestamp)
+
+    stats = {}
+    for (day, direction), count in archived.counts[0].items():
+        bucket = stats.setdefault(_period_key(day, period), {'inbound': 0, 'outbound': 0})
+        bucket[direction] = bucket.get(direction, 0) + count
+
+    live = session.execute(_live(
+        select(group_by.label('period'), VehicleLog.direction, func.count().label('count')),
+        archived.live
+    ).group_by(group_by, VehicleLog.direction))
+    for row in live:
+        bucket = stats.setdefault(str(row.period), {'inbound': 0, 'outbound': 0})
+        bucket[row.direction] = bucket.get(row.direction, 0) + row.count
+    return dict(sorted(stats.items()))
+
+
+def _movement_buckets(period, now):
+    """(start, end, label, date label) per chart bucket, oldest first."""
+    buckets = []
+    if period == 'today':
+        # Today's data by hour
+        start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        for hour in range(24):
+            hour_start = start_date + timedelta(hours=hour)
+            buckets.append((hour_start, hour_start + timedelta(hours=1), f'{hour:02d}:00', None))
+        return buckets
+
+    if period == '7days':
+        for i in range(7):
+            start_of_day = (now - timedelta(days=i)).replace(hour=0, minute=0, second=0, microsecond=0)
+            buckets.append((
+                start_of_day, start_of_day + timedelta(days=1),
+                start_of_day.strftime('%a'), start_of_day.strftime('%Y-%m-%d')
+            ))
+    elif period == 'monthly':
+        for i in range(12):
+            start_of_month = (now - timedelta(days=30*i)).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            if i == 0:
+                end_of_month = now
+            else:
+                end_of_month = (start_of_month + timedelta(days=32)).replace(day=1)
+            buckets.append((
+                start_of_month, end_of_month,
+                start_of_month.strftime('%b %Y'), start_of_month.strftime('%Y-%m')
+            ))
+    elif period == 'yearly':
+        for i in range(5):
+            year = now.year - i
+            buckets.append((datetime(year, 1, 1), datetime(year + 1, 1, 1), str(year), str(year)))
+    else:
+        raise ValueError(f"Unknown period '{period}'")
+    buckets.reverse()
+    return buckets
+
+
+def archived_vehicle_movements(archive_dir, period, now=None):
+    buckets = _movement_buckets(period, now or datetime.utcnow())
+    return Archived(
+        archive_dir,
+        [(('direction',), start, end) for start, end, _, _ in buckets],
+        period=period,
+        labels=[(label, date_label) for _, _, label, date_label in buckets]
+    )
+
+
+def vehicle_movements(session, archived):
+    """Inbound/outbound counts per hour of today, or per day, month or year, oldest first."""
+    movements = []
+    for (_, start, end), counts, (label, date_label) in zip(archived.groupings, archived.counts, archived.labels):
+        movement = {'label': label}
+        if date_label:
+            movement['date'] = date_label
+        movement.update(_direction_counts(session, archived.live, counts, start, end))
+        movements.append(movement)
+    return movements
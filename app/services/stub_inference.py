@@ -0,0 +1,80 @@
+import string
+import time
+import zlib
+import numpy as np
+
+# Car class id in the vehicle model's label set
+STUB_CLASS_ID = 2
+STUB_CONFIDENCE = 0.9
+
+_delay = {'seconds': 0.0}
+
+
+def configure(delay_ms=0):
+    _delay['seconds'] = max(delay_ms, 0) / 1000.0
+
+
+def _pause():
+    if _delay['seconds']:
+        time.sleep(_delay['seconds'])
+
+
+def _vehicle_box(x1, y1, x2, y2):
+    width, height = x2 - x1, y2 - y1
+    return [x1 + width * 0.1, y1 + height * 0.2, x1 + width * 0.9, y1 + height * 0.95]
+
+
+def _plate_box(vehicle):
+    width, height = vehicle[2] - vehicle[0], vehicle[3] - vehicle[1]
+    return [
+        vehicle[0] + width * 0.35, vehicle[1] + height * 0.7,
+        vehicle[0] + width * 0.65, vehicle[1] + height * 0.85
+    ]
+
+
+def _plate_text(frame):
+    """A format-valid plate derived from the image pixels, so repeats of an image agree."""
+    digest = zlib.crc32(np.ascontiguousarray(frame[::8, ::8]).tobytes())
+    letters = string.ascii_uppercase
+    return (
+        'TN'
+        + f"{digest % 100:02d}"
+        + letters[(digest >> 8) % 26] + letters[(digest >> 13) % 26]
+        + f"{(digest >> 18) % 10000:04d}"
+    )
+
+
+def detect_vehicles(frame, imgsz=None):
+    _pause()
+    height, width = frame.shape[:2]
+    return np.array([_vehicle_box(0, 0, width, height) + [STUB_CONFIDENCE, STUB_CLASS_ID]], dtype=np.float32)
+
+
+def detect_plates(frame, regions=None, imgsz=None):
+    _pause()
+    if regions is None:
+        height, width = frame.shape[:2]
+        regions = [_vehicle_box(0, 0, width, height)]
+    return np.array(
+        [_plate_box(region) + [STUB_CONFIDENCE, 0] for region in regions],
+        dtype=np.float32
+    ).reshape(-1, 6)
+
+
+def read_plates(frame, boxes, mode='generic', height=64):
+    _pause()
+    text = _plate_text(frame)
+    return [(text, STUB_CONFIDENCE) for _ in boxes]
+
+
+def warm_up(frame):
+    return True
+
+
+# Drop-in replacement for inference_service.OPS: fixed geometry, no models
+OPS = {
+    'detect_vehicles': detect_vehicles,
+    'detect_plates': detect_plates,
+    'read_plates': read_plates,
+    'warm_up': warm_up,
+}
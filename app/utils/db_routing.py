@@ -0,0 +1,30 @@
+from flask import g
+from sqlalchemy.orm import Session
+from ..extensions import db
+
+REPLICA_BIND = 'replica'
+
+
+def init_app(app):
+    app.teardown_appcontext(close_read_session)
+
+
+def read_session():
+    """Session for read-only dashboard queries.
+
+    Uses the 'replica' bind when DATABASE_REPLICA_URI is configured, so
+    dashboard scans never hold primary connections that gate writes need;
+    otherwise it is simply `db.session`.
+    """
+    engine = db.engines.get(REPLICA_BIND)
+    if engine is None:
+        return db.session
+    if 'read_session' not in g:
+        g.read_session = Session(bind=engine, autoflush=False)
+    return g.read_session
+
+
+def close_read_session(exc=None):
+    session = g.pop('read_session', None)
+    if session is not None:
+        session.close()
@@ -0,0 +1,75 @@
+import threading
+import time
+
+
+class GateDebouncer:
+    """Time-windowed index of recent gate events keyed by (plate, direction, lane).
+
+    A submission is a repeat if the same key was seen less than `window`
+    seconds before; each repeat slides the window forward, so a vehicle
+    idling at the barrier stays folded into one event. Lookups are purely
+    in memory, so no database query is needed to spot a repeat.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._next_prune = 0
+
+    def claim(self, key, window, confidence, now=None):
+        """Return the active entry for `key`, or None after reserving it for a new event.
+
+        Claiming is atomic, so two concurrent submissions of the same plate
+        cannot both create an event.
+        """
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            self._prune(now, window)
+            entry = self._entries.get(key)
+            if entry is not None and now - entry['last_seen'] < window:
+                entry['last_seen'] = now
+                entry['repeats'] += 1
+                return dict(entry)
+            self._entries[key] = {
+                'log_id': None,
+                'result': None,
+                'confidence': confidence,
+                'last_seen': now,
+                'repeats': 0
+            }
+            return None
+
+    def bind(self, key, log_id, result):
+        """Attach the committed log and its check result to a claimed key.
+
+        The cached result lets repeats be answered without a vehicle lookup.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.update(log_id=log_id, result=result)
+
+    def release(self, key):
+        """Forget a claim whose event was never committed."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def improve(self, key, confidence):
+        """Record a better-confidence capture; True if it beats the stored one."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['log_id'] is None or confidence <= entry['confidence']:
+                return False
+            entry['confidence'] = confidence
+            return True
+
+    def _prune(self, now, window):
+        if now < self._next_prune:
+            return
+        self._next_prune = now + window
+        expired = [key for key, entry in self._entries.items() if now - entry['last_seen'] >= window]
+        for key in expired:
+            del self._entries[key]
+
+
+gate_debouncer = GateDebouncer()
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+
+# Tells a client its view is stale and it should refetch before applying new events
+RESYNC_FRAME = "event: resync\ndata: {}\n\n"
+
+
+class EventBus:
+    """In-process fan-out of server-sent events with a bounded replay buffer.
+
+    Each event is rendered to its SSE frame once at publish time and the
+    same string is written to every client. Event ids are `<epoch>-<seq>`;
+    the epoch changes on restart so a client resuming with an id from an
+    earlier process (or one older than the buffer) can be told to resync.
+    """
+
+    def __init__(self, history=500):
+        self.epoch = str(int(time.time()))
+        self._seq = 0
+        self._events = deque(maxlen=history)
+        self._cond = threading.Condition()
+
+    def publish(self, event, data):
+        with self._cond:
+            self._seq += 1
+            frame = f"id: {self.epoch}-{self._seq}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+            self._events.append((self._seq, frame))
+            self._cond.notify_all()
+
+    def latest(self):
+        with self._cond:
+            return self._seq
+
+    def resume_point(self, last_event_id):
+        """Map a Last-Event-ID to a sequence number, or None if it can't be resumed."""
+        if not last_event_id:
+            return self.latest()
+        epoch, _, seq = last_event_id.partition('-')
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        seq = int(seq)
+        with self._cond:
+            oldest = self._events[0][0] if self._events else self._seq + 1
+            if seq > self._seq or seq < oldest - 1:
+                return None
+        return seq
+
+    def wait(self, after, timeout):
+        """Block until events newer than `after` exist (or timeout); return (seq, frames).
+
+        A client that fell behind the replay buffer gets a single resync
+        frame instead of the events that are still buffered.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > after, timeout)
+            if self._events and after < self._events[0][0] - 1:
+                return self._seq, [RESYNC_FRAME]
+            frames = [frame for seq, frame in self._events if seq > after]
+            return self._seq, frames
+
+
+class AsyncEventRelay:
+    """Wakes asyncio SSE handlers when an EventBus gets new events.
+
+    One thread blocks on the bus and hands notifications to the event loop,
+    so any number of async clients can wait without holding a thread each.
+    """
+
+    def __init__(self, bus):
+        self.bus = bus
+        self._loop = None
+        self._changed = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sse-relay', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        seq = self.bus.latest()
+        while not self._stop.is_set():
+            latest, _ = self.bus.wait(seq, 1.0)
+            if latest > seq:
+                seq = latest
+                self._loop.call_soon_threadsafe(self._notify)
+
+    def _notify(self):
+        # Wake every current waiter; later waiters get a fresh Event
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait(self, after, timeout):
+        """Wait until the bus has events newer than `after`; False on timeout.
+
+        Fetch them with `bus.wait(after, 0)`, which also reports a resync
+        if `after` has fallen out of the replay buffer meanwhile.
+        """
+        deadline = self._loop.time() + timeout
+        while self.bus.latest() <= after:
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(self._changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+
+live_events = EventBus()
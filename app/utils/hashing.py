@@ -1,7 +1,66 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from ..extensions import bcrypt
 
-def hash_password(password):
+_settings = {'workers': 2, 'queue_size': 8, 'log_rounds': 12}
+_executor = None
+_slots = None
+_executor_lock = threading.Lock()
+
+
+class HashingBusyError(RuntimeError):
+    pass
+
+
+def init_app(app):
+    _settings['workers'] = app.config.get('BCRYPT_WORKERS', 2)
+    _settings['queue_size'] = app.config.get('BCRYPT_QUEUE_SIZE', 8)
+    _settings['log_rounds'] = app.config.get('BCRYPT_LOG_ROUNDS', 12)
+
+
+def _schedule(fn, *args):
+    """Queue bcrypt work on the bounded executor and return its future.
+
+    At most `workers` hashes run at once and `queue_size` more may wait;
+    beyond that the call fails fast instead of piling up request threads.
+    """
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_settings['workers'], thread_name_prefix='bcrypt')
+            _slots = threading.BoundedSemaphore(_settings['workers'] + _settings['queue_size'])
+
+    if not _slots.acquire(blocking=False):
+        raise HashingBusyError("Password hashing queue is full")
+    try:
+        future = _executor.submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+
+def _generate(password):
     return bcrypt.generate_password_hash(password).decode('utf-8')
 
+
+def hash_password_future(password):
+    """Queue a hash and return its future, for async callers to await."""
+    return _schedule(_generate, password)
+
+def check_password_future(hashed, plain):
+    return _schedule(bcrypt.check_password_hash, hashed, plain)
+
+def hash_password(password):
+    return hash_password_future(password).result()
+
 def check_password(hashed, plain):
-    return bcrypt.check_password_hash(hashed, plain)
+    return check_password_future(hashed, plain).result()
+
+def needs_rehash(hashed):
+    """True if `hashed` was made with fewer rounds than BCRYPT_LOG_ROUNDS."""
+    try:
+        return int(hashed.split('$')[2]) < _settings['log_rounds']
+    except (IndexError, ValueError):
+        return False
@@ -0,0 +1,137 @@
+import atexit
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# Populated in each worker process by the initializer
+_worker_ops = None
+
+
+def _split_cores(workers):
+    """Give every worker a disjoint slice of the cores this process may use."""
+    if hasattr(os, 'sched_getaffinity'):
+        cores = sorted(os.sched_getaffinity(0))
+    else:
+        cores = list(range(os.cpu_count() or 1))
+    per_worker = max(1, len(cores) // workers)
+    core_sets = []
+    for index in range(workers):
+        chunk = cores[index * per_worker:(index + 1) * per_worker]
+        core_sets.append(chunk or [cores[index % len(cores)]])
+    return core_sets
+
+
+def _init_worker(counter, core_sets, threads, loader):
+    global _worker_ops
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    cores = core_sets[index % len(core_sets)]
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cores)
+    _worker_ops = loader(threads or len(cores))
+
+
+def _run_task(op, shm_name, shape, dtype, kwargs):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    frame = None
+    try:
+        frame = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        return _worker_ops[op](frame, **kwargs)
+    finally:
+        # The view must be released before the mapping can be closed
+        del frame
+        shm.close()
+
+
+class SharedFrame:
+    """A decoded frame staged in shared memory for inference workers.
+
+    The frame is copied into the segment once; every op run against it maps
+    the same buffer in the worker instead of pickling pixels over a pipe.
+    """
+
+    def __init__(self, pool, frame):
+        self._pool = pool
+        self.shape = frame.shape
+        self.dtype = frame.dtype.str
+        self._shm = shared_memory.SharedMemory(create=True, size=max(frame.nbytes, 1))
+        np.ndarray(frame.shape, dtype=frame.dtype, buffer=self._shm.buf)[...] = frame
+
+    def run(self, op, **kwargs):
+        executor = self._pool.executor
+        try:
+            future = executor.submit(_run_task, op, self._shm.name, self.shape, self.dtype, kwargs)
+            return future.result(timeout=self._pool.timeout)
+        except BrokenProcessPool:
+            # This request fails, but later ones get a fresh set of workers
+            self._pool.restart(executor)
+            raise
+
+    def close(self):
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class InferencePool:
+    """Process pool whose workers are pinned to cores and hold their own models.
+
+    `loader` must be a picklable top-level callable; it runs once in every
+    worker with the torch thread count to use and returns a dict of ops
+    (name -> callable(frame, **kwargs)).
+    """
+
+    def __init__(self, workers, loader, threads=0, timeout=60):
+        self.workers = workers
+        self.loader = loader
+        self.threads = threads
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self.executor = self._start()
+        atexit.register(self.shutdown)
+
+    def _start(self):
+        ctx = mp.get_context('spawn')
+        counter = ctx.Value('i', 0)
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(counter, _split_cores(self.workers), self.threads, self.loader)
+        )
+
+    def restart(self, broken):
+        """Replace `broken` with a new executor, unless another thread already has.
+
+        A worker that crashed (OOM kill, segfault) or whose initializer
+        raised breaks the whole ProcessPoolExecutor for good.
+        """
+        with self._lock:
+            if self.executor is not broken:
+                return
+            logger.error("Inference pool broken, restarting workers", extra={'workers': self.workers})
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.executor = self._start()
+
+    def stage(self, frame):
+        return SharedFrame(self, np.ascontiguousarray(frame))
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,123 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import queue
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import g, has_request_context, request
+
+# Attributes every LogRecord carries; anything else was passed through `extra`
+_RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+
+# (request_id, path) of an ASGI request served outside Flask; see app.asgi.RequestIdMiddleware
+request_context = contextvars.ContextVar('request_context', default=None)
+
+
+class JsonFormatter(logging.Formatter):
+    """Render a record as a single JSON line, including any `extra` fields."""
+
+    def format(self, record):
+        payload = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_') and value is not None:
+                payload[key] = value
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload['exc_info'] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
+class StructuredQueueHandler(QueueHandler):
+    """QueueHandler that keeps `extra` fields instead of pre-formatting to text."""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class RequestContextFilter(logging.Filter):
+    """Attach the current request id and path to records logged inside a request."""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = getattr(g, 'request_id', None)
+            record.path = request.path
+        elif request_context.get() is not None:
+            record.request_id, record.path = request_context.get()
+        return True
+
+
+class StageTimer:
+    """Collect per-stage wall-clock timings (in ms) for a single request."""
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def __call__(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[stage] = round((time.perf_counter() - start) * 1000, 2)
+
+
+def get_logger(name):
+    return logging.getLogger(name)
+
+
+def setup_logging(app):
+    """Route the `app` logger through a queue drained by a background thread.
+
+    Request threads only enqueue records; formatting and the blocking write to
+    stdout happen on the listener thread.
+    """
+    global _listener
+
+    level = app.config.get('LOG_LEVEL', 'INFO')
+    root = logging.getLogger('app')
+    root.setLevel(level)
+    root.propagate = False
+
+    if _listener is None:
+        log_queue = queue.Queue(-1)
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(JsonFormatter())
+        _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+        queue_handler = StructuredQueueHandler(log_queue)
+        queue_handler.addFilter(RequestContextFilter())
+        root.addHandler(queue_handler)
+
+    @app.before_request
+    def assign_request_id():
+        g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+
+    @app.after_request
+    def echo_request_id(response):
+        request_id = getattr(g, 'request_id', None)
+        if request_id:
+            response.headers['X-Request-ID'] = request_id
+        return response
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import threading
+
+# Where `flask models fetch` downloads each model from. Nothing else in the
+# app talks to the hub; at runtime paths come from the local manifest only.
+MODEL_SOURCES = {
+    'vehicle': {'repo_id': "balaji2003/yolov8x-model", 'filename': "yolov8x.pt"},
+    'plate': {'repo_id': "balaji2003/yolov8x-model", 'filename': "license_plate_detector.pt"},
+}
+# EasyOCR weights, stored under <model dir>/easyocr
+EASYOCR_DIR = 'easyocr'
+EASYOCR_FILES = {
+    'ocr_detector': 'craft_mlt_25k.pth',
+    'ocr_recognizer': 'english_g2.pth',
+}
+
+_verified = {}
+_verified_lock = threading.Lock()
+
+
+class ModelManifestError(RuntimeError):
+    pass
+
+
+def manifest_path(model_dir, manifest=None):
+    return manifest or os.path.join(model_dir, 'manifest.json')
+
+
+def sha256sum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(model_dir, manifest=None):
+    path = manifest_path(model_dir, manifest)
+    try:
+        with open(path) as f:
+            return json.load(f)['models']
+    except FileNotFoundError:
+        raise ModelManifestError(f"Model manifest not found at {path}; run `flask models fetch`")
+    except (KeyError, ValueError) as e:
+        raise ModelManifestError(f"Invalid model manifest {path}: {e}")
+
+
+def resolve(name, model_dir, manifest=None):
+    """Return the local path of model `name`, verifying its checksum once per process."""
+    entry = load_manifest(model_dir, manifest).get(name)
+    if entry is None:
+        raise ModelManifestError(f"Model '{name}' is not listed in the manifest")
+
+    path = os.path.join(model_dir, entry['path'])
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise ModelManifestError(f"Model file for '{name}' is missing: {path}")
+
+    key = (path, stat.st_size, stat.st_mtime)
+    with _verified_lock:
+        if key not in _verified:
+            if sha256sum(path) != entry['sha256']:
+                raise ModelManifestError(f"Checksum mismatch for model '{name}' at {path}")
+            _verified[key] = True
+    return path
+
+
+def easyocr_dir(model_dir, manifest=None, detector=True):
+    """Verify the EasyOCR weights and return the directory holding them."""
+    for name in EASYOCR_FILES:
+        if name == 'ocr_detector' and not detector:
+            continue
+        resolve(name, model_dir, manifest)
+    return os.path.join(model_dir, EASYOCR_DIR)
+
+
+def fetch_models(model_dir, manifest=None):
+    """Download every model into `model_dir` and write the manifest with checksums."""
+    from huggingface_hub import hf_hub_download
+    import easyocr
+
+    os.makedirs(model_dir, exist_ok=True)
+    entries = {}
+    for name, source in MODEL_SOURCES.items():
+        path = hf_hub_download(local_dir=model_dir, **source)
+        entries[name] = {
+            'path': os.path.relpath(path, model_dir),
+            'sha256': sha256sum(path),
+            'source': source
+        }
+
+    ocr_dir = os.path.join(model_dir, EASYOCR_DIR)
+    os.makedirs(ocr_dir, exist_ok=True)
+    easyocr.Reader(['en'], gpu=False, model_storage_directory=ocr_dir, download_enabled=True)
+    for name, filename in EASYOCR_FILES.items():
+        path = os.path.join(ocr_dir, filename)
+        entries[name] = {
+            'path': os.path.relpath(path, model_dir),
+            'sha256': sha256sum(path)
+        }
+
+    path = manifest_path(model_dir, manifest)
+    with open(path, 'w') as f:
+        json.dump({'models': entries}, f, indent=2)
+    return path
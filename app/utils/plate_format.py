@@ -0,0 +1,60 @@
+import re
+from functools import lru_cache
+from itertools import product
+
+# Characters OCR commonly swaps on plates, in both directions
+CONFUSABLE = {
+    '0': 'O', 'O': '0', 'D': '0', 'Q': '0',
+    '1': 'I', 'I': '1', 'L': '1',
+    '2': 'Z', 'Z': '2',
+    '5': 'S', 'S': '5',
+    '6': 'G', 'G': '6',
+    '8': 'B', 'B': '8',
+}
+
+# Cap on confusable positions considered, to bound the number of variants
+MAX_SWAPS = 8
+
+# Placeholder asset ids given to vehicles whose plate could not be read
+ASSET_ID_PREFIX = 'ASSET-'
+
+
+@lru_cache(maxsize=8)
+def _compile(formats):
+    return [re.compile(pattern) for pattern in formats]
+
+
+def candidates(text):
+    """Yield `text` and its confusable-character variants, fewest swaps first."""
+    positions = [i for i, ch in enumerate(text) if ch in CONFUSABLE][:MAX_SWAPS]
+    variants = []
+    for mask in product((False, True), repeat=len(positions)):
+        chars = list(text)
+        for swap, i in zip(mask, positions):
+            if swap:
+                chars[i] = CONFUSABLE[chars[i]]
+        variants.append((sum(mask), ''.join(chars)))
+    variants.sort(key=lambda v: v[0])
+    for _, variant in variants:
+        yield variant
+
+
+def best_plate(text, formats):
+    """Return the first candidate reading of `text` matching a regional format.
+
+    Falls back to the cleaned OCR text when nothing matches or no formats
+    are configured.
+    """
+    cleaned = re.sub(r'[^A-Z0-9]', '', (text or '').upper())
+    if not cleaned or not formats:
+        return cleaned
+    patterns = _compile(tuple(formats))
+    for candidate in candidates(cleaned):
+        if any(pattern.fullmatch(candidate) for pattern in patterns):
+            return candidate
+    return cleaned
+
+
+def is_read_plate(value):
+    """True for a plate read from an image, False for empty values and placeholder asset ids."""
+    return bool(value) and not value.startswith(ASSET_ID_PREFIX)
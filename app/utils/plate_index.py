@@ -0,0 +1,75 @@
+import threading
+from collections import Counter, defaultdict
+
+
+def trigrams(text):
+    """pg_trgm-style trigrams: two leading blanks and one trailing blank."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class PlateIndex:
+    """In-memory trigram index over distinct plates.
+
+    Used for plate search when the database has no pg_trgm. Scores match
+    pg_trgm's `similarity()`, so results rank the same either way. The
+    index only grows and adding a known plate is a no-op: callers feed it
+    plates from log rows with ids near or above `last_id`, overlapping
+    the previous catch-up so rows that commit out of id order are still
+    picked up, which keeps it current across worker processes.
+    """
+
+    def __init__(self):
+        self._postings = defaultdict(set)
+        self._gram_counts = {}
+        self._lock = threading.Lock()
+        self.last_id = 0
+
+    def add(self, plates, last_id):
+        with self._lock:
+            for plate in plates:
+                if plate and plate not in self._gram_counts:
+                    grams = trigrams(plate)
+                    self._gram_counts[plate] = len(grams)
+                    for gram in grams:
+                        self._postings[gram].add(plate)
+            self.last_id = max(self.last_id, last_id)
+
+    def search(self, query, mode='contains', limit=20, min_similarity=0.3):
+        """Return up to `limit` (score, plate) pairs, best first.
+
+        'contains' matches plates holding `query` as a substring; 'fuzzy'
+        matches plates whose trigram similarity is at least `min_similarity`.
+        """
+        query_grams = trigrams(query)
+        with self._lock:
+            if mode == 'contains':
+                inner = [query[i:i + 3] for i in range(len(query) - 2)]
+                if inner:
+                    # Rarest trigram first keeps the intersection small
+                    postings = sorted((self._postings.get(gram, set()) for gram in inner), key=len)
+                    candidates = set(postings[0]).intersection(*postings[1:])
+                else:
+                    candidates = self._gram_counts.keys()
+                scored = [
+                    (self._similarity(query_grams, plate, len(query_grams & trigrams(plate))), plate)
+                    for plate in candidates if query in plate
+                ]
+            else:
+                shared = Counter()
+                for gram in query_grams:
+                    shared.update(self._postings.get(gram, ()))
+                scored = [
+                    (score, plate) for plate, score in (
+                        (plate, self._similarity(query_grams, plate, count)) for plate, count in shared.items()
+                    ) if score >= min_similarity
+                ]
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return scored[:limit]
+
+    def _similarity(self, query_grams, plate, shared):
+        union = len(query_grams) + self._gram_counts[plate] - shared
+        return shared / union if union else 0.0
+
+
+plate_index = PlateIndex()
@@ -0,0 +1,49 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets: `capacity` burst, refilled at `rate` tokens/second.
+
+    Buckets are kept in LRU order and the least recently used are dropped
+    beyond `max_keys`, so memory stays bounded under key-spraying.
+    """
+
+    def __init__(self, rate, capacity, max_keys=10000):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def allow(self, *keys):
+        """Take one token from every key's bucket; False (and take none) if any is empty."""
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            for key in keys:
+                tokens, updated = self._buckets.get(key, (self.capacity, now))
+                levels.append(min(self.capacity, tokens + (now - updated) * self.rate))
+            allowed = all(level >= 1 for level in levels)
+            for key, level in zip(keys, levels):
+                self._buckets[key] = (level - 1 if allowed else level, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return allowed
+
+    def retry_after(self):
+        """Seconds until a drained bucket has a token again."""
+        return max(1, int(1 / self.rate)) if self.rate else 60
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name, per_minute, burst):
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = TokenBucketLimiter(per_minute / 60.0, burst)
+        return _limiters[name]
@@ -0,0 +1,279 @@
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer, want_bytes
+from sqlalchemy import delete, select
+from werkzeug.datastructures import CallbackDict
+
+from ..extensions import db
+from ..models.session import UserSession
+from .logger import get_logger
+
+logger = get_logger(__name__)
+serializer = TaggedJSONSerializer()
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+
+
+class SqliteSessionStore:
+    """Sessions in a local SQLite file with an index on expiry."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "sid TEXT PRIMARY KEY, data BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_sessions_expires_at ON sessions (expires_at)")
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            self._local.conn = conn
+        return conn
+
+    def get(self, sid):
+        row = self._conn().execute(
+            "SELECT data FROM sessions WHERE sid = ? AND expires_at > ?", (sid, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, sid, data, lifetime):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO sessions (sid, data, expires_at) VALUES (?, ?, ?)",
+            (sid, data, time.time() + lifetime.total_seconds())
+        )
+        conn.commit()
+
+    def delete(self, sid):
+        conn = self._conn()
+        conn.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+        conn.commit()
+
+    def purge(self):
+        conn = self._conn()
+        removed = conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),)).rowcount
+        conn.commit()
+        return removed
+
+
+class DatabaseSessionStore:
+    """Sessions in the app database's `user_session` table, shared by every host.
+
+    Uses its own connections rather than `db.session` so saving a session
+    never commits the request's own pending changes.
+    """
+
+    def __init__(self):
+        self._engine = None
+
+    @property
+    def engine(self):
+        # Resolved on first use inside an app context, then reused by the purge thread
+        if self._engine is None:
+            self._engine = db.engine
+        return self._engine
+
+    def get(self, sid):
+        table = UserSession.__table__
+        with self.engine.connect() as conn:
+            return conn.execute(
+                select(table.c.data).where(table.c.id == sid, table.c.expires_at > datetime.utcnow())
+            ).scalar()
+
+    def set(self, sid, data, lifetime):
+        table = UserSession.__table__
+        expires_at = datetime.utcnow() + lifetime
+        with self.engine.begin() as conn:
+            updated = conn.execute(
+                table.update().where(table.c.id == sid).values(data=data, expires_at=expires_at)
+            ).rowcount
+            if not updated:
+                conn.execute(table.insert().values(id=sid, data=data, expires_at=expires_at))
+
+    def delete(self, sid):
+        table = UserSession.__table__
+        with self.engine.begin() as conn:
+            conn.execute(delete(table).where(table.c.id == sid))
+
+    def purge(self):
+        table = UserSession.__table__
+        with self.engine.begin() as conn:
+            return conn.execute(delete(table).where(table.c.expires_at <= datetime.utcnow())).rowcount
+
+
+class CachedSessionStore:
+    """In-process read-through LRU in front of another store.
+
+    Writes and deletes go straight through and refresh the cache. Entries
+    live for at most `ttl` seconds, which bounds how stale a session can be
+    when another app server behind the load balancer has changed it.
+    """
+
+    def __init__(self, store, ttl=5, max_entries=10000):
+        self.store = store
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, sid, data):
+        with self._lock:
+            self._cache[sid] = (data, time.monotonic() + self.ttl)
+            self._cache.move_to_end(sid)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def get(self, sid):
+        with self._lock:
+            cached = self._cache.get(sid)
+            if cached and cached[1] > time.monotonic():
+                self._cache.move_to_end(sid)
+                return cached[0]
+        data = self.store.get(sid)
+        if data is not None:
+            self._remember(sid, data)
+        return data
+
+    def set(self, sid, data, lifetime):
+        self.store.set(sid, data, lifetime)
+        self._remember(sid, data)
+
+    def delete(self, sid):
+        with self._lock:
+            self._cache.pop(sid, None)
+        self.store.delete(sid)
+
+    def purge(self):
+        with self._lock:
+            self._cache.clear()
+        return self.store.purge()
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Flask session interface backed by one of the stores above.
+
+    Sessions are only written back when modified, and expired rows are
+    purged on a background thread at most once per `purge_interval`.
+    """
+
+    def __init__(self, store, use_signer=True, purge_interval=300):
+        self.store = store
+        self.use_signer = use_signer
+        self.purge_interval = purge_interval
+        self._next_purge = 0
+        self._purge_lock = threading.Lock()
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt='flask-session', key_derivation='hmac')
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            sid = cookie
+            if self.use_signer:
+                try:
+                    sid = self._signer(app).unsign(cookie).decode('utf-8')
+                except BadSignature:
+                    sid = None
+            if sid:
+                data = self.store.get(sid)
+                if data is not None:
+                    try:
+                        return ServerSideSession(serializer.loads(want_bytes(data).decode('utf-8')), sid=sid)
+                    except ValueError:
+                        pass
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        name = self.get_cookie_name(app)
+
+        if not session:
+            if session.modified:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if not self.should_set_cookie(app, session):
+            return
+
+        self.store.set(
+            session.sid,
+            serializer.dumps(dict(session)).encode('utf-8'),
+            app.permanent_session_lifetime
+        )
+        self._maybe_purge()
+
+        cookie_value = session.sid
+        if self.use_signer:
+            cookie_value = self._signer(app).sign(want_bytes(session.sid)).decode('utf-8')
+        response.set_cookie(
+            name,
+            cookie_value,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+
+    def _maybe_purge(self):
+        now = time.monotonic()
+        with self._purge_lock:
+            if now < self._next_purge:
+                return
+            self._next_purge = now + self.purge_interval
+        threading.Thread(target=self._purge, name='session-purge', daemon=True).start()
+
+    def _purge(self):
+        try:
+            removed = self.store.purge()
+            if removed:
+                logger.info("Purged expired sessions", extra={'removed': removed})
+        except Exception:
+            logger.exception("Session purge failed")
+
+
+def create_session_interface(app):
+    """Build the session interface selected by SESSION_BACKEND ('sqlite' or 'database')."""
+    backend = app.config['SESSION_BACKEND']
+    if backend == 'sqlite':
+        path = app.config.get('SESSION_SQLITE_PATH') or os.path.join(app.instance_path, 'sessions.sqlite')
+        store = SqliteSessionStore(path)
+    elif backend == 'database':
+        store = DatabaseSessionStore()
+    else:
+        raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
+
+    if app.config.get('SESSION_CACHE_TTL', 0) > 0:
+        store = CachedSessionStore(store, ttl=app.config['SESSION_CACHE_TTL'])
+    return ServerSideSessionInterface(
+        store,
+        use_signer=app.config.get('SESSION_USE_SIGNER', True),
+        purge_interval=app.config.get('SESSION_PURGE_INTERVAL', 300)
+    )
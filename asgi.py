@@ -0,0 +1,13 @@
+from dotenv import load_dotenv
+load_dotenv()
+from app import create_app
+from app.asgi import create_asgi_app
+from app.extensions import db
+
+flask_app = create_app()
+
+with flask_app.app_context():
+    db.create_all()
+
+# Serve with an ASGI server, e.g. `uvicorn asgi:app --workers 1`
+app = create_asgi_app(flask_app)
@@ -1,6 +1,85 @@
 import os
 
+def _engine_options(uri):
+    # SQLite (used in local runs and CI) doesn't take QueuePool sizing options
+    if not uri or uri.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1") == "1",
+    }
+
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URI")
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(SQLALCHEMY_DATABASE_URI)
+    # Optional read replica for dashboard queries (see app/utils/db_routing.py)
+    DATABASE_REPLICA_URI = os.getenv("DATABASE_REPLICA_URI")
+    SQLALCHEMY_BINDS = {"replica": DATABASE_REPLICA_URI} if DATABASE_REPLICA_URI else {}
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = os.getenv("SECRET_KEY")
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    # Inference worker processes (0 runs models on the request thread)
+    INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))
+    # Torch intra-op threads per worker (0 uses the worker's pinned core count)
+    INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", "0"))
+    INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", "60"))
+    # 'stub' swaps the models for fixed fake detections (load tests and CI), optionally with a per-call delay
+    INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "models")
+    INFERENCE_STUB_DELAY_MS = float(os.getenv("INFERENCE_STUB_DELAY_MS", "0"))
+    # 'plate' recognises plate crops directly with an A-Z0-9 alphabet; 'generic' runs full EasyOCR
+    OCR_MODE = os.getenv("OCR_MODE", "plate")
+    PLATE_OCR_HEIGHT = int(os.getenv("PLATE_OCR_HEIGHT", "64"))
+    # Regional plate formats, separated by ';' (defaults: Indian standard and BH series)
+    PLATE_FORMATS = [
+        pattern for pattern in os.getenv(
+            "PLATE_FORMATS",
+            r"[A-Z]{2}[0-9]{1,2}[A-Z]{0,3}[0-9]{4};[0-9]{2}BH[0-9]{4}[A-Z]{1,2}"
+        ).split(";") if pattern
+    ]
+    # 'cascade' runs the vehicle detector first and the plate detector only on vehicle crops
+    DETECTION_MODE = os.getenv("DETECTION_MODE", "full")
+    VEHICLE_IMGSZ = int(os.getenv("VEHICLE_IMGSZ", "416"))
+    PLATE_IMGSZ = int(os.getenv("PLATE_IMGSZ", "320"))
+    # Local model files and their checksum manifest (populated by `flask models fetch`)
+    MODEL_DIR = os.getenv("MODEL_DIR", "models")
+    MODEL_MANIFEST = os.getenv("MODEL_MANIFEST", "")
+    # Load models and run a dummy inference in the background at startup
+    MODEL_WARMUP = os.getenv("MODEL_WARMUP", "0") == "1"
+    # bcrypt cost factor; existing hashes below it are upgraded on login
+    BCRYPT_LOG_ROUNDS = int(os.getenv("BCRYPT_LOG_ROUNDS", "12"))
+    # Threads that run bcrypt, and how many more requests may wait for one
+    BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", "2"))
+    BCRYPT_QUEUE_SIZE = int(os.getenv("BCRYPT_QUEUE_SIZE", "8"))
+    # Token bucket per client IP and per email for /api/auth
+    AUTH_RATE_PER_MINUTE = float(os.getenv("AUTH_RATE_PER_MINUTE", "10"))
+    AUTH_RATE_BURST = int(os.getenv("AUTH_RATE_BURST", "5"))
+    # Proxies in front of the app that append to X-Forwarded-For (0 trusts the socket address)
+    TRUSTED_PROXIES = int(os.getenv("TRUSTED_PROXIES", "0"))
+    # 'sqlite' (local file), 'database' (user_session table, shared across hosts) or 'filesystem'
+    SESSION_BACKEND = os.getenv("SESSION_BACKEND", "sqlite")
+    SESSION_SQLITE_PATH = os.getenv("SESSION_SQLITE_PATH", "")
+    # Seconds a session may be served from the in-process cache (0 disables it)
+    SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "5"))
+    SESSION_PURGE_INTERVAL = int(os.getenv("SESSION_PURGE_INTERVAL", "300"))
+    # Seconds between keepalive comments on the live movements stream
+    SSE_HEARTBEAT_SECONDS = int(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+    # Open live streams allowed per process under WSGI, where each one holds a worker thread
+    SSE_MAX_STREAMS = int(os.getenv("SSE_MAX_STREAMS", "32"))
+    # Dwell time after which a vehicle still inside is reported as overstaying
+    OVERSTAY_HOURS = float(os.getenv("OVERSTAY_HOURS", "12"))
+    # Repeat checks of the same plate/direction/lane within this many seconds fold into one event (0 disables)
+    GATE_DEBOUNCE_SECONDS = float(os.getenv("GATE_DEBOUNCE_SECONDS", "10"))
+    # Keep the highest-confidence capture of a folded event as its image
+    GATE_DEBOUNCE_KEEP_BEST_IMAGE = os.getenv("GATE_DEBOUNCE_KEEP_BEST_IMAGE", "1") == "1"
+    # Gate events older than ARCHIVE_AFTER_DAYS are moved to Parquet files under ARCHIVE_DIR by `flask archive run`
+    ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+    ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+    # Plate search: recent events returned per matching plate, and the fuzzy-match similarity floor
+    PLATE_SEARCH_EVENTS = int(os.getenv("PLATE_SEARCH_EVENTS", "5"))
+    PLATE_SEARCH_MIN_SIMILARITY = float(os.getenv("PLATE_SEARCH_MIN_SIMILARITY", "0.3"))
+    # ASGI mode (asgi.py): async driver URL (derived from DATABASE_URI when empty) and threads serving the Flask routes
+    ASYNC_DATABASE_URI = os.getenv("ASYNC_DATABASE_URI", "")
+    ASGI_WSGI_WORKERS = int(os.getenv("ASGI_WSGI_WORKERS", "16"))
@@ -0,0 +1,405 @@
+"""Replay gate images against a running server and report how it holds up.
+
+Each lane is an independent Poisson arrival stream of vehicles. An arrival
+either goes through `/check-vehicle` or through `/upload-image` followed by
+`/log-vehicle`; some arrivals resubmit the lane's previous image to mimic a
+vehicle waiting at the barrier. Dashboard clients poll the read endpoints at
+the same time. Arrivals are open-loop: a slow server does not slow the
+offered load, so queueing shows up as latency.
+
+Reports throughput, latency percentiles and error rates per endpoint, plus
+the CPU and RSS of the server process tree sampled from /proc.
+
+    python scripts/loadtest.py --images samples/ --lanes 4 --rate 6 --duration 120
+
+With --serve the script starts the app itself on the stub inference backend
+(INFERENCE_BACKEND=stub) in a throwaway working directory, so uploads,
+sessions and, unless DATABASE_URI and SECRET_KEY are set, the SQLite
+database and key are discarded afterwards. That is enough to run it in CI:
+
+    python scripts/loadtest.py --serve --images samples/ --duration 30 --max-error-rate 0.01
+
+Only the standard library is used, so it runs from any Python 3.8+.
+"""
+import argparse
+import json
+import mimetypes
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib import error, request
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+ADMIN = '/api/admin'
+DEFAULT_DASHBOARD_MIX = (
+    'recent-movements=4,occupancy=2,vehicle-stats=2,api/vehicle-logs=2,'
+    'api/vehicle-stats=1,vehicle-movements/today=1,vehicle-movements/monthly=1,authorized-vehicles=1'
+)
+PERCENTILES = (50, 90, 95, 99)
+
+
+class Recorder:
+    """Thread-safe log of (finish time, endpoint, latency, status) samples."""
+
+    def __init__(self):
+        self.samples = []
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def add(self, endpoint, latency, status):
+        with self._lock:
+            self.samples.append((time.monotonic(), endpoint, latency, status))
+
+    def drop(self):
+        with self._lock:
+            self.dropped += 1
+
+    def since(self, start):
+        with self._lock:
+            return [s for s in self.samples if s[0] >= start]
+
+
+def _multipart(fields, filename, content):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="image"; filename="{filename}"\r\n'
+        f'Content-Type: {content_type}\r\n\r\n'.encode() + content + b'\r\n'
+    )
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def _call(recorder, endpoint, url, data=None, content_type=None, timeout=60):
+    """Send one request and record it; returns (status, parsed JSON body or None)."""
+    headers = {'Content-Type': content_type} if content_type else {}
+    req = request.Request(url, data=data, headers=headers, method='POST' if data is not None else 'GET')
+    started = time.monotonic()
+    status, body = 0, None
+    try:
+        with request.urlopen(req, timeout=timeout) as resp:
+            status = resp.status
+            raw = resp.read()
+    except error.HTTPError as e:
+        status = e.code
+        raw = e.read()
+    except Exception:
+        raw = b''
+    recorder.add(endpoint, time.monotonic() - started, status)
+    try:
+        body = json.loads(raw) if raw else None
+    except ValueError:
+        pass
+    return status, body
+
+
+def gate_arrival(args, recorder, lane, image, direction):
+    filename, content = image
+    if random.random() < args.upload_share:
+        data, content_type = _multipart({}, filename, content)
+        status, body = _call(recorder, 'upload-image', args.base_url + ADMIN + '/upload-image', data, content_type)
+        if status == 200 and body and body.get('session_id'):
+            payload = json.dumps({
+                'session_id': body['session_id'],
+                'direction': direction,
+                'driver_name': f'loadtest-lane-{lane}'
+            }).encode()
+            _call(recorder, 'log-vehicle', args.base_url + ADMIN + '/log-vehicle', payload, 'application/json')
+    else:
+        data, content_type = _multipart({'direction': direction, 'lane': f'lane-{lane}'}, filename, content)
+        _call(recorder, 'check-vehicle', args.base_url + ADMIN + '/check-vehicle', data, content_type)
+
+
+def run_lane(args, recorder, executor, lane, images, deadline, inflight):
+    rng = random.Random(args.seed + lane)
+    direction = 'inbound' if lane % 2 == 0 else 'outbound'
+    previous = None
+    next_arrival = time.monotonic()
+    while True:
+        next_arrival += rng.expovariate(args.rate / 60.0)
+        delay = next_arrival - time.monotonic()
+        if next_arrival >= deadline:
+            return
+        if delay > 0:
+            time.sleep(delay)
+        if previous is not None and rng.random() < args.repeat_share:
+            image = previous
+        else:
+            image = previous = rng.choice(images)
+        if not inflight.acquire(blocking=False):
+            # Client-side cap reached: the server is too far behind to keep offering load
+            recorder.drop()
+            continue
+        future = executor.submit(gate_arrival, args, recorder, lane, image, direction)
+        future.add_done_callback(lambda _: inflight.release())
+
+
+def run_dashboard(args, recorder, client, mix, deadline):
+    rng = random.Random(args.seed * 1000 + client)
+    endpoints, weights = zip(*mix)
+    while time.monotonic() < deadline:
+        endpoint = rng.choices(endpoints, weights)[0]
+        _call(recorder, endpoint, f'{args.base_url}{ADMIN}/{endpoint}')
+        time.sleep(rng.uniform(0.5, 1.5) * args.poll_interval)
+
+
+def _proc_tree(root):
+    """PIDs of `root` and all its descendants."""
+    children = defaultdict(list)
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+                children[ppid].append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    pids, stack = [], [root]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, ()))
+    return pids
+
+
+def _proc_usage(pids):
+    """Total CPU ticks and RSS bytes across `pids`."""
+    ticks, rss = 0, 0
+    page = os.sysconf('SC_PAGE_SIZE')
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            with open(f'/proc/{pid}/statm') as f:
+                rss += int(f.read().split()[1]) * page
+            ticks += int(fields[11]) + int(fields[12])
+        except (OSError, IndexError, ValueError):
+            continue
+    return ticks, rss
+
+
+def sample_server(args, recorder, pid, timeline, stop):
+    clock = os.sysconf('SC_CLK_TCK')
+    last_ticks, _ = _proc_usage(_proc_tree(pid))
+    last_time = time.monotonic()
+    while not stop.wait(args.sample_interval):
+        pids = _proc_tree(pid)
+        ticks, rss = _proc_usage(pids)
+        now = time.monotonic()
+        window = recorder.since(last_time)
+        timeline.append({
+            't': round(now - args.started, 1),
+            'cpu_percent': round(max(ticks - last_ticks, 0) / clock / (now - last_time) * 100, 1),
+            'rss_mb': round(rss / 1024 / 1024, 1),
+            'processes': len(pids),
+            'requests': len(window),
+            'errors': sum(1 for s in window if not 200 <= s[3] < 300)
+        })
+        last_ticks, last_time = ticks, now
+
+
+def _percentile(ordered, pct):
+    if not ordered:
+        return None
+    index = max(int(round(pct / 100.0 * len(ordered))) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def summarize(recorder, elapsed):
+    by_endpoint = defaultdict(list)
+    for _, endpoint, latency, status in recorder.samples:
+        by_endpoint[endpoint].append((latency, status))
+
+    endpoints = {}
+    for endpoint, rows in sorted(by_endpoint.items()):
+        latencies = sorted(latency for latency, _ in rows)
+        statuses = defaultdict(int)
+        for _, status in rows:
+            statuses[str(status)] += 1
+        errors = sum(count for status, count in statuses.items() if not status.startswith('2'))
+        endpoints[endpoint] = {
+            'requests': len(rows),
+            'throughput_rps': round(len(rows) / elapsed, 2),
+            'error_rate': round(errors / len(rows), 4),
+            'statuses': dict(statuses),
+            'latency_ms': dict(
+                [(f'p{p}', round(_percentile(latencies, p) * 1000, 1)) for p in PERCENTILES]
+                + [('max', round(latencies[-1] * 1000, 1))]
+            )
+        }
+    total = len(recorder.samples)
+    errors = sum(1 for s in recorder.samples if not 200 <= s[3] < 300)
+    return {
+        'elapsed_s': round(elapsed, 1),
+        'requests': total,
+        'throughput_rps': round(total / elapsed, 2) if elapsed else 0,
+        'error_rate': round(errors / total, 4) if total else 0,
+        'dropped_arrivals': recorder.dropped,
+        'endpoints': endpoints
+    }
+
+
+def print_report(report):
+    print(f"\n{report['requests']} requests in {report['elapsed_s']}s "
+          f"({report['throughput_rps']} req/s), error rate {report['error_rate']:.2%}, "
+          f"dropped arrivals {report['dropped_arrivals']}")
+    header = f"{'endpoint':<28}{'reqs':>7}{'rps':>8}{'err%':>7}" + ''.join(f"{'p' + str(p):>9}" for p in PERCENTILES)
+    print(header)
+    for endpoint, stats in report['endpoints'].items():
+        latency = stats['latency_ms']
+        print(f"{endpoint:<28}{stats['requests']:>7}{stats['throughput_rps']:>8}"
+              f"{stats['error_rate'] * 100:>7.1f}" + ''.join(f"{latency['p' + str(p)]:>9}" for p in PERCENTILES))
+    if report.get('server'):
+        print(f"\n{'t(s)':>7}{'cpu%':>8}{'rss MB':>9}{'procs':>7}{'reqs':>7}{'errs':>6}")
+        for point in report['server']:
+            print(f"{point['t']:>7}{point['cpu_percent']:>8}{point['rss_mb']:>9}"
+                  f"{point['processes']:>7}{point['requests']:>7}{point['errors']:>6}")
+
+
+def load_images(folder):
+    images = []
+    for name in sorted(os.listdir(folder)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            with open(os.path.join(folder, name), 'rb') as f:
+                images.append((name, f.read()))
+    if not images:
+        raise SystemExit(f"No images found in {folder}")
+    return images
+
+
+def parse_mix(spec):
+    mix = []
+    for item in spec.split(','):
+        endpoint, _, weight = item.strip().partition('=')
+        mix.append((endpoint.strip('/'), float(weight or 1)))
+    return mix
+
+
+def start_server(args, scratch):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, INFERENCE_BACKEND=args.serve_backend, MODEL_WARMUP='0')
+    # The server runs from `scratch`, so relative paths (uploads, archive) land there
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [root, env.get('PYTHONPATH')]))
+    env.setdefault('DATABASE_URI', f"sqlite:///{os.path.join(scratch, 'loadtest.sqlite')}")
+    env.setdefault('SESSION_SQLITE_PATH', os.path.join(scratch, 'sessions.sqlite'))
+    env.setdefault('MODEL_DIR', os.path.join(root, 'models'))
+    env.setdefault('SECRET_KEY', uuid.uuid4().hex)
+    port = args.base_url.rsplit(':', 1)[-1].split('/')[0]
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'flask', '--app', 'run:app', 'run', '--no-reload', '--no-debugger', '--port', port],
+        cwd=scratch, env=env
+    )
+    deadline = time.monotonic() + args.startup_timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"Server exited during startup with code {server.returncode}")
+        try:
+            request.urlopen(f'{args.base_url}{ADMIN}/occupancy', timeout=2).close()
+            return server
+        except error.HTTPError:
+            return server
+        except OSError:
+            time.sleep(0.5)
+    server.terminate()
+    raise SystemExit("Server did not start in time")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--images', required=True, help='Folder of gate images to replay')
+    parser.add_argument('--lanes', type=int, default=2)
+    parser.add_argument('--rate', type=float, default=6, help='Mean vehicle arrivals per minute per lane')
+    parser.add_argument('--upload-share', type=float, default=0.2,
+                        help='Share of arrivals sent through /upload-image + /log-vehicle instead of /check-vehicle')
+    parser.add_argument('--repeat-share', type=float, default=0.1,
+                        help='Share of arrivals that resubmit the lane\'s previous image')
+    parser.add_argument('--dashboards', type=int, default=2, help='Concurrent dashboard clients')
+    parser.add_argument('--poll-interval', type=float, default=5, help='Mean seconds between dashboard polls')
+    parser.add_argument('--dashboard-mix', default=DEFAULT_DASHBOARD_MIX,
+                        help='Comma-separated endpoint=weight pairs under /api/admin')
+    parser.add_argument('--duration', type=float, default=60, help='Seconds of offered load')
+    parser.add_argument('--max-inflight', type=int, default=256, help='Cap on outstanding gate requests')
+    parser.add_argument('--server-pid', type=int, help='Server PID to sample CPU/RSS for (with its children)')
+    parser.add_argument('--sample-interval', type=float, default=1)
+    parser.add_argument('--serve', action='store_true', help='Start the app locally for the run')
+    parser.add_argument('--serve-backend', default='stub', choices=('stub', 'models'))
+    parser.add_argument('--startup-timeout', type=float, default=60)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--report', help='Write the full report as JSON to this path')
+    parser.add_argument('--max-error-rate', type=float,
+                        help='Exit non-zero when the overall error rate exceeds this')
+    args = parser.parse_args()
+    args.base_url = args.base_url.rstrip('/')
+
+    images = load_images(args.images)
+    mix = parse_mix(args.dashboard_mix)
+    scratch = tempfile.TemporaryDirectory(prefix='loadtest-') if args.serve else None
+    server = start_server(args, scratch.name) if args.serve else None
+    pid = server.pid if server else args.server_pid
+
+    recorder = Recorder()
+    timeline = []
+    stop = threading.Event()
+    inflight = threading.BoundedSemaphore(args.max_inflight)
+    args.started = time.monotonic()
+    deadline = args.started + args.duration
+
+    sampler = None
+    if pid and os.path.isdir(f'/proc/{pid}'):
+        sampler = threading.Thread(target=sample_server, args=(args, recorder, pid, timeline, stop), daemon=True)
+        sampler.start()
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.max_inflight, thread_name_prefix='gate') as executor:
+            threads = [
+                threading.Thread(target=run_lane, args=(args, recorder, executor, lane, images, deadline, inflight))
+                for lane in range(args.lanes)
+            ] + [
+                threading.Thread(target=run_dashboard, args=(args, recorder, client, mix, deadline))
+                for client in range(args.dashboards)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        # Executor exit waits for in-flight gate requests to finish
+    finally:
+        stop.set()
+        if sampler:
+            sampler.join()
+        if server:
+            server.terminate()
+            server.wait()
+            scratch.cleanup()
+
+    report = summarize(recorder, time.monotonic() - args.started)
+    report['server'] = timeline
+    report['config'] = {
+        'lanes': args.lanes, 'rate_per_lane_per_min': args.rate, 'upload_share': args.upload_share,
+        'repeat_share': args.repeat_share, 'dashboards': args.dashboards, 'poll_interval_s': args.poll_interval,
+        'duration_s': args.duration, 'images': len(images)
+    }
+    print_report(report)
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.max_error_rate is not None and report['error_rate'] > args.max_error_rate:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()